@@ -1,10 +1,15 @@
 import os
+import json
+import asyncio
+import contextvars
+from collections import deque
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import httpx
-import requests
 import logging
 import traceback
+from utils.mbt import MBT_API_URL, CircuitOpenError, guarded_request, mbt_guard
+from utils.tracing import tracer_from_env
 
 # Basic logger for debug output; can be overridden by project logging
 logging.basicConfig(level=logging.ERROR)
@@ -21,16 +26,94 @@ ALLOWED_FORUM_IDS = [
     1414748182675587203,  # Feedback
 ]
 
+# Overridden by FORUM_CHECKPOINT_FILE. Put it on a volume in containers: a lost file means
+# missed messages are skipped instead of backfilled after the next deploy.
+CHECKPOINT_FILE = "forum_checkpoints.json"
+CHECKPOINT_SAVE_SECONDS = 10
+BACKFILL_CONCURRENCY = 4  # Threads backfilled at the same time
+DEFERRED_RETRY_SECONDS = 5  # Minimum wait between attempts to replay work deferred by an open circuit
+DEFERRED_TICKET_LIMIT = 500  # Ticket messages held while the API is down; the oldest are dropped beyond this
+
+
+class CheckpointStore:
+    """The ID of the last message mirrored for each thread, saved to a JSON file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.checkpoints = {}
+        self.dirty = False
+        try:
+            with open(path) as f:
+                self.checkpoints = {k: int(v) for k, v in json.load(f).items()}
+        except FileNotFoundError:
+            # print, as this module's logging is configured for errors only
+            print(
+                f"⚠️ No forum checkpoints at {os.path.abspath(path)}; starting fresh, so messages missed while "
+                "offline won't be backfilled. Set FORUM_CHECKPOINT_FILE to a path on a persistent volume."
+            )
+        except Exception:
+            logger.exception("Failed to load forum checkpoints from %s", path)
+
+    def get(self, thread_id, default=None):
+        return self.checkpoints.get(thread_id, default)
+
+    def update(self, thread_id, message_id):
+        if message_id > self.checkpoints.get(thread_id, 0):
+            self.checkpoints[thread_id] = message_id
+            self.dirty = True
+
+    def watermark(self):
+        """The newest message mirrored in any thread, or None before anything has been mirrored."""
+        return max(self.checkpoints.values(), default=None)
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.checkpoints, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception:
+            logger.exception("Failed to save forum checkpoints to %s", self.path)
+
+
 class ForumCog(commands.Cog):
     def __init__(self, bot, guild_id, forum_channel_id, bot_ready_event):
         self.bot = bot
         self.guild_id = guild_id
         self.forum_channel_id = forum_channel_id
         self.bot_ready = bot_ready_event
+        self.checkpoints = CheckpointStore(os.getenv("FORUM_CHECKPOINT_FILE", CHECKPOINT_FILE))
+        self.thread_locks = {}  # thread_id -> asyncio.Lock, so live and backfilled messages don't interleave
+        self.known_threads = set()  # thread IDs the website already has
+        self.caught_up = set()  # thread IDs backfilled since the bot last connected
+        self.backfill_lock = asyncio.Lock()
+        self.tracer = tracer_from_env()
+        self.ticket_channels = set()  # channel IDs known to belong to a ticket
+        self.deferred_threads = {}  # thread_id -> (channel, forum_id) to backfill once the API recovers
+        self.deferred_tickets = deque(maxlen=DEFERRED_TICKET_LIMIT)
+        self.replay_task = None
+        self.backfill_task = None
+
+    async def cog_load(self):
+        self.save_checkpoints.start()
+
+    async def cog_unload(self):
+        self.save_checkpoints.cancel()
+        for task in (self.replay_task, self.backfill_task):
+            if task:
+                task.cancel()
+        self.checkpoints.save()
+        self.tracer.close()
 
     @commands.Cog.listener()
     async def on_ready(self):
         self.bot_ready.set()
+        # on_ready also fires after a gateway reconnect, which is when messages may have been missed
+        self.caught_up.clear()
+        self.backfill_task = asyncio.create_task(self.backfill())
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
@@ -59,73 +142,121 @@ class ForumCog(commands.Cog):
             else:
 
                 # Check if a ticket exists and if so send the message to that ticket rather than the forum
+                with self.tracer.span("ticket.mirror", channel_id=str(channel.id)):
+                    await self.mirror_ticket_message(message)
+
+        if process_message:
+            with self.tracer.span("forum.mirror", thread_id=thread_id, channel_id=str(channel.id), forum_id=forum_id):
+                async with self.thread_lock(thread_id):
+                    if thread_id in self.deferred_threads:
+                        # Earlier messages are waiting on the API; the replay sends this one after them
+                        pass
+                    elif thread_id not in self.caught_up:
+                        # First message since connecting: send anything missed before it first, in order
+                        if self.checkpoints.get(thread_id) is None and self.checkpoints.watermark() is None:
+                            self.checkpoints.update(thread_id, message.id - 1)
+                        await self.catch_up(channel, thread_id, forum_id, self.checkpoints.watermark())
+                    # A backfill may already have mirrored this message
+                    elif message.id > self.checkpoints.get(thread_id, 0):
+                        if not await self.mirror_message(message, thread_id, forum_id):
+                            # Send it again, in order, before the thread's next message
+                            if self.checkpoints.get(thread_id) is None:
+                                self.checkpoints.update(thread_id, message.id - 1)
+                            self.caught_up.discard(thread_id)
+
+        await self.bot.process_commands(message)
+
+    async def mirror_ticket_message(self, message):
+        """Send a message in a ticket channel to the matching ticket on the website."""
+        channel = message.channel
+
+        try:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                with self.tracer.span("ticket.lookup") as span:
+                    response = await guarded_request(
+                        "tickets", client, "GET", f"{MBT_API_URL}/tickets/?discord_channel_id={channel.id}"
+                    )
+                    span.set(status=response.status_code)
+                if response.status_code != 200:
+                    return
+                ticket = response.json()
+                self.ticket_channels.add(channel.id)
+
+                Username = os.getenv("Username")
+                Password = os.getenv("Password")
+
+                # Authenticate user via API key
+                with self.tracer.span("ticket.login"):
+                    auth_resp = await guarded_request(
+                        "auth", client, "POST",
+                        f"{MBT_API_URL}/user/",
+                        json={"username": Username, "password": Password},
+                    )
                 try:
-                    response = requests.get(f"https://www.mybustimes.cc/api/tickets/?discord_channel_id={channel.id}")
-                except Exception as e:
-                    logger.exception("Synchronous ticket check failed for channel %s", channel.id)
-                    response = None
-
-                if response and response.status_code == 200:
-                    ticket = response.json()
-
-                    Username = os.getenv("Username")
-                    Password = os.getenv("Password")
-                    
-                    async with httpx.AsyncClient() as client:
-                        # Authenticate user via API key
-                        auth_resp = await client.post(
-                            "https://www.mybustimes.cc/api/user/",
-                            json={"username": Username, "password": Password},
-                            timeout=10.0
+                    auth_resp.raise_for_status()
+                    key = auth_resp.json().get("session_key")
+                except Exception:
+                    logger.exception("Authentication failed for API user %s", Username)
+                    return
+
+                headers = {"Authorization": key}
+                data = {"content": message.content, "sender_username": str(message.author)}
+
+                # If there is an attachment in Discord
+                if message.attachments:
+                    attachment = message.attachments[0]
+                    with self.tracer.span("attachment.download") as span:
+                        file_bytes = await attachment.read()
+                        span.set(bytes=len(file_bytes))
+                    files = {"files": (attachment.filename, file_bytes, attachment.content_type)}
+                else:
+                    files = {}
+
+                if ticket:
+                    with self.tracer.span("ticket.post", ticket_id=ticket.get("id")) as span:
+                        ticket_post = await guarded_request(
+                            "tickets", client, "POST",
+                            f"{MBT_API_URL}/key-auth/{ticket['id']}/messages/",
+                            data=data,
+                            files=files,
+                            headers=headers,
                         )
-                        try:
-                            auth_resp.raise_for_status()
-                            key = auth_resp.json().get("session_key")
-                        except Exception:
-                            logger.exception("Authentication failed for API user %s", Username)
-                            return
-
-                        # Send message to ticket
-                        ticket_resp = await client.get(f"https://www.mybustimes.cc/api/tickets/?discord_channel_id={channel.id}", timeout=10.0)
-                        try:
-                            ticket_resp.raise_for_status()
-                            ticket = ticket_resp.json()
-                        except Exception:
-                            logger.exception("Failed to fetch ticket details for channel %s", channel.id)
-                            ticket = None
-
-                        ticket_msg_payload = {"content": message.content, "username": str(message.author)}
-                        headers = {"Authorization": key}
-
-                        files = {}
-                        data = {"content": message.content, "sender_username": str(message.author)}
-
-                        # If there is an attachment in Discord
-                        if message.attachments:
-                            attachment = message.attachments[0]
-                            file_bytes = await attachment.read()
-                            files = {"files": (attachment.filename, file_bytes, attachment.content_type)}
-                        else:
-                            files = {}
-
-                        if ticket:
-                            try:
-                                ticket_post = await client.post(
-                                    f"https://www.mybustimes.cc/api/key-auth/{ticket['id']}/messages/",
-                                    data=data,
-                                    files=files,
-                                    headers=headers,
-                                    timeout=10.0
-                                )
-
-                            except Exception:
-                                logger.exception("Failed to POST message to ticket %s", ticket.get('id') if ticket else 'unknown')
-                        else:
-                            pass
+                        span.set(status=ticket_post.status_code)
+        except CircuitOpenError:
+            # Messages in channels we have never seen a ticket for are most likely not ticket messages
+            if channel.id in self.ticket_channels:
+                self.defer_ticket(message)
+        except Exception:
+            logger.exception("Failed to mirror message to the ticket for channel %s", channel.id)
 
-        if process_message:
-            async with httpx.AsyncClient() as client:
-                check_response = await client.get(f"https://www.mybustimes.cc/api/check-thread/{thread_id}/")
+    def thread_lock(self, thread_id):
+        lock = self.thread_locks.get(thread_id)
+        if lock is None:
+            lock = self.thread_locks[thread_id] = asyncio.Lock()
+        return lock
+
+    async def mirror_message(self, message, thread_id, forum_id):
+        """Send one forum message to the website and advance the thread's checkpoint.
+
+        Returns False, leaving the checkpoint, on network errors and 5xx responses so the message
+        is retried; a message the website rejects with a 4xx is skipped.
+
+        While the forum API circuit is open the message is left for the deferred backfill instead.
+        """
+        try:
+            return await self.send_forum_message(message, thread_id, forum_id)
+        except CircuitOpenError:
+            self.defer_thread(message.channel, thread_id, forum_id, message.id)
+            return False
+
+    async def send_forum_message(self, message, thread_id, forum_id):
+        channel = message.channel
+
+        async with httpx.AsyncClient() as client:
+            if thread_id not in self.known_threads:
+                with self.tracer.span("check-thread") as span:
+                    check_response = await guarded_request("forum", client, "GET", f"{MBT_API_URL}/check-thread/{thread_id}/")
+                    span.set(status=check_response.status_code)
                 if check_response.status_code == 404:
                     create_payload = {
                         "discord_channel_id": thread_id,
@@ -135,44 +266,205 @@ class ForumCog(commands.Cog):
                         "first_post": message.content,
                     }
                     try:
-                        create_resp = await client.post("https://www.mybustimes.cc/api/create-thread/", json=create_payload)
+                        with self.tracer.span("create-thread") as span:
+                            create_resp = await guarded_request(
+                                "forum", client, "POST", f"{MBT_API_URL}/create-thread/", json=create_payload
+                            )
+                            span.set(status=create_resp.status_code)
+                        if create_resp.status_code < 400:
+                            self.known_threads.add(thread_id)
+                    except CircuitOpenError:
+                        raise
                     except Exception:
                         logger.exception("Failed to create thread for thread_id=%s forum_id=%s", thread_id, forum_id)
-                else:
-                    pass
-
-                payload = {
-                    "thread_channel_id": thread_id,
-                    "forum_id": forum_id,
-                    "author": str(message.author),
-                    "content": message.content,
-                }
-
-            files = None
-            if message.attachments:
-                attachment = message.attachments[0]
+                elif check_response.status_code == 200:
+                    self.known_threads.add(thread_id)
+
+            payload = {
+                "thread_channel_id": thread_id,
+                "forum_id": forum_id,
+                "author": str(message.author),
+                "content": message.content,
+            }
+
+        files = None
+        if message.attachments:
+            attachment = message.attachments[0]
+            with self.tracer.span("attachment.download") as span:
                 file_bytes = await attachment.read()
-                files = {"image": (attachment.filename, file_bytes)}
+                span.set(bytes=len(file_bytes))
+            files = {"image": (attachment.filename, file_bytes)}
 
-            async with httpx.AsyncClient() as client:
-                try:
+        async with httpx.AsyncClient() as client:
+            try:
+                with self.tracer.span("discord-message.post") as span:
                     if files:
-                        resp = await client.post(
-                            "https://www.mybustimes.cc/api/discord-message/",
+                        resp = await guarded_request(
+                            "forum", client, "POST",
+                            f"{MBT_API_URL}/discord-message/",
                             data=payload,
                             files=files,
                         )
                     else:
-                        resp = await client.post(
-                            "https://www.mybustimes.cc/api/discord-message/",
+                        resp = await guarded_request(
+                            "forum", client, "POST",
+                            f"{MBT_API_URL}/discord-message/",
                             json=payload,
                         )
-                    
-                    print(f"Sent message to forum thread {thread_id} by {str(message.author)} (status={resp.status_code})")
+                    span.set(status=resp.status_code)
+
+                print(f"Sent message to forum thread {thread_id} by {str(message.author)} (status={resp.status_code})")
+            except CircuitOpenError:
+                raise
+            except Exception:
+                logger.exception("Failed to send message to Django API for thread %s", thread_id)
+                return False
+
+        if resp.status_code >= 500:
+            return False
+        if resp.status_code >= 400:
+            # Retrying won't change the answer, and stopping here would hold back the whole thread
+            print(f"⚠️ Website rejected message {message.id} in thread {thread_id} (status={resp.status_code}); skipping it")
+
+        self.checkpoints.update(thread_id, message.id)
+        return True
+
+    def defer_thread(self, channel, thread_id, forum_id, message_id):
+        """Backfill this thread once the forum API circuit lets calls through again."""
+        if self.checkpoints.get(thread_id) is None:
+            # Without a checkpoint the backfill would start from the watermark and could skip this message
+            self.checkpoints.update(thread_id, message_id - 1)
+        self.deferred_threads[thread_id] = (channel, forum_id)
+        self.schedule_replay()
+
+    def defer_ticket(self, message):
+        if len(self.deferred_tickets) == self.deferred_tickets.maxlen:
+            logger.warning("Deferred ticket queue full, dropping the oldest message")
+        self.deferred_tickets.append(message)
+        self.schedule_replay()
+
+    def schedule_replay(self):
+        if self.replay_task is None or self.replay_task.done():
+            # A fresh context, so the replay doesn't inherit the trace of the message that deferred work
+            self.replay_task = asyncio.create_task(self.replay_deferred(), context=contextvars.Context())
+
+    async def replay_deferred(self):
+        """Retry deferred work whenever its circuits are due to let a probe through, until none is left.
+
+        Threads wait on the forum circuit and tickets on the tickets and auth circuits. Work that
+        hits an open circuit again simply defers itself for the next round.
+        """
+        ticket_groups = ("tickets", "auth")
+        while self.deferred_threads or self.deferred_tickets:
+            waits = []
+            if self.deferred_threads:
+                waits.append(mbt_guard("forum").retry_in())
+            if self.deferred_tickets:
+                waits.append(max(mbt_guard(group).retry_in() for group in ticket_groups))
+            await asyncio.sleep(max(min(waits), DEFERRED_RETRY_SECONDS))
+
+            # catch_up clears each thread's deferral under its lock, or defers it again
+            watermark = self.checkpoints.watermark()
+            for thread_id, (channel, forum_id) in list(self.deferred_threads.items()):
+                if mbt_guard("forum").is_open():
+                    break  # Don't read Discord history for messages that can't be sent yet
+                try:
+                    sent = await self.backfill_thread(channel, thread_id, forum_id, watermark)
+                    if sent:
+                        print(f"Mirrored {sent} deferred message(s) to forum thread {thread_id}")
                 except Exception:
-                    logger.exception("Failed to send message to Django API for thread %s", thread_id)
+                    logger.exception("Deferred backfill failed for thread %s", thread_id)
+                    self.deferred_threads.pop(thread_id, None)  # Left to the next full backfill
 
-        await self.bot.process_commands(message)
+            if any(mbt_guard(group).is_open() for group in ticket_groups):
+                continue
+            tickets = list(self.deferred_tickets)
+            self.deferred_tickets.clear()
+            for message in tickets:
+                await self.mirror_ticket_message(message)
+
+    def backfill_targets(self):
+        """Yield (channel, thread_id, forum_id) for every mirrored channel the bot can see."""
+        for channel_id in ALLOWED_FORUM_IDS:
+            channel = self.bot.get_channel(channel_id)
+            if isinstance(channel, discord.ForumChannel):
+                for thread in channel.threads:
+                    yield thread, str(thread.id), str(channel_id)
+            elif isinstance(channel, discord.TextChannel):
+                yield channel, str(channel.id), str(channel.id)
+
+    async def backfill(self):
+        """Mirror messages posted while the bot or the API was down. Returns the number sent."""
+        if self.backfill_lock.locked():
+            return 0
+
+        async with self.backfill_lock:
+            semaphore = asyncio.Semaphore(BACKFILL_CONCURRENCY)
+            watermark = self.checkpoints.watermark()
+
+            async def run(channel, thread_id, forum_id):
+                async with semaphore:
+                    return await self.backfill_thread(channel, thread_id, forum_id, watermark)
+
+            results = await asyncio.gather(
+                *(run(*target) for target in self.backfill_targets()), return_exceptions=True
+            )
+
+        sent = 0
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Forum backfill failed for a thread: %r", result)
+            else:
+                sent += result
+        self.checkpoints.save()
+        print(f"Forum backfill mirrored {sent} missed message(s)")
+        return sent
+
+    async def backfill_thread(self, channel, thread_id, forum_id, watermark):
+        async with self.thread_lock(thread_id):
+            return await self.catch_up(channel, thread_id, forum_id, watermark)
+
+    async def catch_up(self, channel, thread_id, forum_id, watermark):
+        """Mirror a thread's messages after its checkpoint, oldest first. The caller holds the thread lock.
+
+        The thread only counts as caught up once every message has been sent, so until then live
+        messages come back through here rather than moving the checkpoint past the gap.
+        """
+        self.deferred_threads.pop(thread_id, None)
+        checkpoint = self.checkpoints.get(thread_id)
+        if checkpoint is None:
+            # A thread we have never mirrored: only messages newer than anything we have mirrored
+            # can have been missed, and on the very first run there is nothing to catch up on.
+            if watermark is None or channel.last_message_id is None:
+                if channel.last_message_id:
+                    self.checkpoints.update(thread_id, channel.last_message_id)
+                self.caught_up.add(thread_id)
+                return 0
+            checkpoint = watermark
+
+        if channel.last_message_id is not None and channel.last_message_id <= checkpoint:
+            self.caught_up.add(thread_id)
+            return 0
+
+        sent = 0
+        async for message in channel.history(after=discord.Object(id=checkpoint), oldest_first=True, limit=None):
+            if message.author == self.bot.user:
+                continue
+            with self.tracer.span("forum.backfill", thread_id=thread_id, channel_id=str(channel.id), forum_id=forum_id):
+                mirrored = await self.mirror_message(message, thread_id, forum_id)
+            if not mirrored:
+                # Leave the checkpoint here so the next backfill retries from this message
+                return sent
+            sent += 1
+
+        self.caught_up.add(thread_id)
+        return sent
+
+    @tasks.loop(seconds=CHECKPOINT_SAVE_SECONDS)
+    async def save_checkpoints(self):
+        self.checkpoints.save()
+        # Also write out buffered spans, so traces reach the file even at low sample rates
+        self.tracer.flush()
 
 # This is the key fix: async setup function
 async def setup(bot):
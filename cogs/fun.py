@@ -1,43 +1,201 @@
 import os
+import asyncio
 import random
+import time
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
+from urllib.parse import urlparse, parse_qs
 
 WELCOME_CHANNEL_ID = int(os.getenv("WELCOME_CHANNEL_ID", 0))
 
 # Path to your images folder
 IMAGES_DIR = os.path.join(os.path.dirname(__file__), "..", "images")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif")
+IMAGE_RESCAN_SECONDS = 60
+URL_EXPIRY_MARGIN = 3600  # Re-upload an image this many seconds before its CDN URL expires
+
+WELCOME_BATCH_WINDOW = float(os.getenv("WELCOME_BATCH_WINDOW", 5))  # Seconds between welcomes in a channel
+WELCOME_BATCH_SIZE = int(os.getenv("WELCOME_BATCH_SIZE", 20))  # Most members mentioned in one welcome
+WELCOME_MENTIONS = discord.AllowedMentions(everyone=False, roles=False, users=True)
+
+
+class WelcomeImages:
+    """The welcome images on disk and the Discord CDN URL of each one already uploaded.
+
+    A URL points at an attachment on one welcome message and stops working if that message
+    is deleted, so it is forgotten when the message is.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {}  # filename -> mtime
+        self.names = []
+        self.urls = {}  # filename -> (url, expires_at, message_id)
+
+    def scan(self):
+        """Re-read the folder, forgetting uploads of files that were removed or changed."""
+        try:
+            files = {
+                entry.name: entry.stat().st_mtime
+                for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)
+            }
+        except OSError as e:
+            print(f"Failed to scan {self.directory}: {e}")
+            return
+
+        if files == self.files:
+            return
+
+        for name in list(self.urls):
+            if files.get(name) != self.files.get(name):
+                del self.urls[name]
+
+        self.files = files
+        self.names = sorted(files)
+        print(f"Loaded {len(self.names)} welcome images")
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def cached_url(self, name):
+        cached = self.urls.get(name)
+        if cached and cached[1] - time.time() > URL_EXPIRY_MARGIN:
+            return cached[0]
+        return None
+
+    def remember(self, name, url, message_id):
+        # Signed CDN URLs carry their expiry as a hex timestamp in the "ex" parameter
+        expires = parse_qs(urlparse(url).query).get("ex")
+        try:
+            expires_at = int(expires[0], 16)
+        except (TypeError, ValueError):
+            expires_at = time.time() + 86400
+        self.urls[name] = (url, expires_at, message_id)
+
+    def forget_messages(self, message_ids):
+        for name, (_, _, message_id) in list(self.urls.items()):
+            if message_id in message_ids:
+                del self.urls[name]
+
+
+class WelcomeScheduler:
+    """Sends a welcome straight away when a channel is quiet and batches joins during a burst.
+
+    After each welcome, joins for that channel wait until WELCOME_BATCH_WINDOW has passed and
+    are then sent together, up to WELCOME_BATCH_SIZE mentions per message.
+    """
+
+    def __init__(self, send):
+        self.send = send  # async callable(channel, members)
+        self.pending = {}  # channel_id -> list of members waiting
+        self.last_sent = {}  # channel_id -> loop time of the last welcome
+        self.flushers = {}  # channel_id -> asyncio.Task
+
+    def add(self, channel, member):
+        loop = asyncio.get_running_loop()
+        pending = self.pending.setdefault(channel.id, [])
+        if member.id not in {m.id for m in pending}:
+            pending.append(member)
+
+        if channel.id not in self.flushers:
+            self.flushers[channel.id] = loop.create_task(self.flush(channel))
+
+    async def flush(self, channel):
+        loop = asyncio.get_running_loop()
+        try:
+            while self.pending.get(channel.id):
+                wait = self.last_sent.get(channel.id, 0) + WELCOME_BATCH_WINDOW - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                pending = self.pending[channel.id]
+                batch = pending[:WELCOME_BATCH_SIZE]
+                del pending[:WELCOME_BATCH_SIZE]
+
+                self.last_sent[channel.id] = loop.time()
+                try:
+                    await self.send(channel, batch)
+                except Exception as e:
+                    print(f"Failed to send welcome for {len(batch)} member(s): {e}")
+        finally:
+            self.flushers.pop(channel.id, None)
+            if not self.pending.get(channel.id):
+                self.pending.pop(channel.id, None)
+
+    def cancel(self):
+        for task in self.flushers.values():
+            task.cancel()
+
 
 class FunCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.images = WelcomeImages(IMAGES_DIR)
+        self.welcomes = WelcomeScheduler(self.send_welcome)
+
+    async def cog_load(self):
+        self.rescan_images.start()
+
+    async def cog_unload(self):
+        self.rescan_images.cancel()
+        self.welcomes.cancel()
+
+    @tasks.loop(seconds=IMAGE_RESCAN_SECONDS)
+    async def rescan_images(self):
+        """Load the image list at startup and pick up added, changed or removed files."""
+        self.images.scan()
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
-        """Send a welcome message with a random image from local storage."""
+        """Queue a welcome message; joins arriving close together share one message."""
         channel = member.guild.get_channel(WELCOME_CHANNEL_ID)
         if not channel:
             return
 
+        self.welcomes.add(channel, member)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        # Raw events fire for uncached messages too; a deleted welcome takes its image URL with it
+        self.images.forget_messages({payload.message_id})
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        self.images.forget_messages(payload.message_ids)
+
+    async def send_welcome(self, channel, members):
+        """Send one welcome with a random image for all of members, uploading each image only once."""
+        mentions = ", ".join(m.mention for m in members)
+
         # Pick a random image from the folder
-        images = [f for f in os.listdir(IMAGES_DIR) if f.lower().endswith((".png", ".jpg", ".jpeg", ".gif"))]
-        if not images:
-            await channel.send(f"Welcome {member.mention}! (no images found in {IMAGES_DIR})")
+        if not self.images.names:
+            await channel.send(f"Welcome {mentions}! (no images found in {IMAGES_DIR})", allowed_mentions=WELCOME_MENTIONS)
             return
 
-        chosen_image = random.choice(images)
-        file_path = os.path.join(IMAGES_DIR, chosen_image)
+        chosen_image = random.choice(self.images.names)
 
         # Create embed
         embed = discord.Embed(
             title="Welcome To MBT",
-            description=f"Glad to have you here, {member.mention}!",
+            description=f"Glad to have you here, {mentions}!",
             color=discord.Color.blue()
         )
-        file = discord.File(file_path, filename=chosen_image)
+
+        url = self.images.cached_url(chosen_image)
+        if url:
+            embed.set_image(url=url)
+            await channel.send(content=f"Welcome {mentions}!", embed=embed, allowed_mentions=WELCOME_MENTIONS)
+            return
+
+        file = discord.File(self.images.path(chosen_image), filename=chosen_image)
         embed.set_image(url=f"attachment://{chosen_image}")
 
-        await channel.send(content=f"Welcome {member.mention}!", embed=embed, file=file)
+        message = await channel.send(
+            content=f"Welcome {mentions}!", embed=embed, file=file, allowed_mentions=WELCOME_MENTIONS
+        )
+        if message.embeds and message.embeds[0].image.url:
+            self.images.remember(chosen_image, message.embeds[0].image.url, message.id)
 
 async def setup(bot):
     await bot.add_cog(FunCog(bot))
@@ -1,38 +1,98 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 import os
+import re
+import asyncio
 import httpx
 from main import GUILD_ID
+from utils.mbt import MBT_API_URL, CircuitOpenError, guarded_request
+from utils.github import GitHubClient
 
 guild_id = GUILD_ID
 
+BADGES_URL = f"{MBT_API_URL}/all-available-badges/"
+BADGE_REFRESH_MINUTES = 10
+GITHUB_REPO = "NextStopLabs/MyBusTimes"
+FOLLOWUP_WAIT_SECONDS = 600  # Interaction followups expire after 15 minutes; longer waits report in the channel
+
+
+class BadgeIndex:
+    """Badge names with precomputed lower-cased keys for ranked autocomplete."""
+
+    def __init__(self, names=()):
+        self.choices = [app_commands.Choice(name=n[:100], value=n) for n in names]
+        self.keys = [n.lower() for n in names]
+        # Offsets where a word starts, e.g. "gold star" -> [0, 5]
+        self.word_starts = [[m.start() for m in re.finditer(r"\b\w", k)] for k in self.keys]
+
+    def __len__(self):
+        return len(self.choices)
+
+    def match(self, current, limit=25):
+        """Rank prefix matches first, then word-boundary matches, then other substrings."""
+        query = current.lower().strip()
+        if not query:
+            return self.choices[:limit]
+
+        prefix, word, substring = [], [], []
+        for choice, key, starts in zip(self.choices, self.keys, self.word_starts):
+            pos = key.find(query)
+            if pos < 0:
+                continue
+            if pos == 0:
+                prefix.append(choice)
+                if len(prefix) >= limit:
+                    break
+            elif any(key.startswith(query, s) for s in starts):
+                word.append(choice)
+            else:
+                substring.append(choice)
+
+        return (prefix + word + substring)[:limit]
+
 
 class GeneralCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.badge_choices = []
+        self.badges = BadgeIndex()
+        self.badges_etag = None
+        github_token = os.getenv("GITHUB_ISSUE_PK")
+        self.github = GitHubClient(github_token) if github_token else None
         self.allowed_user_ids = {
             int(uid.strip())
             for uid in os.getenv("ALLOWED_USER_IDS", "").split(",")
             if uid.strip().isdigit()
         }
 
+    async def cog_load(self):
+        self.refresh_badges.start()
+
+    async def cog_unload(self):
+        self.refresh_badges.cancel()
+        if self.github:
+            await self.github.close()
+
     async def fetch_badges(self):
-        """Fetch the list of available badges from the API."""
+        """Fetch the list of available badges from the API, skipping the download if unchanged."""
+        headers = {"If-None-Match": self.badges_etag} if self.badges_etag else {}
         try:
             async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.get("https://www.mybustimes.cc/api/all-available-badges/")
+                resp = await guarded_request("badges", client, "GET", BADGES_URL, headers=headers)
+                if resp.status_code == 304:
+                    return
                 resp.raise_for_status()
                 data = resp.json()
                 badges = data.get("badges", [])
-                self.badge_choices = [
-                    app_commands.Choice(name=b["badge_name"], value=b["badge_name"])
-                    for b in badges
-                ]
+                self.badges = BadgeIndex([b["badge_name"] for b in badges])
+                self.badges_etag = resp.headers.get("ETag")
         except Exception as e:
+            # Keep serving the last good list until the next refresh
             print(f"⚠️ Failed to fetch badges: {e}")
-            self.badge_choices = [app_commands.Choice(name="Error loading badges", value="Error")]
+
+    @tasks.loop(minutes=BADGE_REFRESH_MINUTES)
+    async def refresh_badges(self):
+        await self.fetch_badges()
 
     # A command /link that will open a link on the MBT with site https://www.mybustimes.cc/u/link?username={username}
     @app_commands.guilds(discord.Object(id=guild_id))
@@ -72,8 +132,9 @@ class GeneralCog(commands.Cog):
         try:
             async with httpx.AsyncClient(timeout=10.0) as client:
                 # Authenticate
-                auth_resp = await client.post(
-                    "https://www.mybustimes.cc/api/user/",
+                auth_resp = await guarded_request(
+                    "auth", client, "POST",
+                    f"{MBT_API_URL}/user/",
                     json={"username": username, "password": password},
                 )
                 auth_resp.raise_for_status()
@@ -84,8 +145,9 @@ class GeneralCog(commands.Cog):
                     return
 
                 # Give badge
-                resp = await client.post(
-                    "https://www.mybustimes.cc/api/user/add_badge/",
+                resp = await guarded_request(
+                    "badges", client, "POST",
+                    f"{MBT_API_URL}/user/add_badge/",
                     json={"session_key": key, "badge": badge_name, "user": user, "give": give},
                 )
 
@@ -102,6 +164,8 @@ class GeneralCog(commands.Cog):
                     f"❌ Failed to give badge. Status: {resp.status_code}\nResponse: {resp.text}"
                 )
 
+        except CircuitOpenError:
+            await interaction.followup.send("❌ MyBusTimes isn't responding right now, please try again in a minute.")
         except httpx.HTTPStatusError as e:
             await interaction.followup.send(f"❌ HTTP error: {e.response.status_code} - {e.response.text}")
         except httpx.RequestError as e:
@@ -112,11 +176,8 @@ class GeneralCog(commands.Cog):
     # 🔽 Attach autocomplete for the badge_name field
     @badge.autocomplete("badge_name")
     async def badge_autocomplete(self, interaction: discord.Interaction, current: str):
-        if not self.badge_choices:
-            await self.fetch_badges()
-        return [
-            choice for choice in self.badge_choices if current.lower() in choice.name.lower()
-        ][:25]  # Discord only supports 25 max
+        # Served from the index kept up to date by refresh_badges, never from the network
+        return self.badges.match(current, limit=25)  # Discord only supports 25 max
 
 
     @app_commands.guilds(discord.Object(id=guild_id))
@@ -142,47 +203,57 @@ class GeneralCog(commands.Cog):
 
         await interaction.response.defer(thinking=True)
 
-        github_token = os.getenv("GITHUB_ISSUE_PK")
-        if not github_token:
+        if self.github is None:
             await interaction.followup.send("❌ Missing GitHub token in environment variables.")
             return
 
-        api_url = "https://api.github.com/repos/NextStopLabs/MyBusTimes/issues"
+        if self.github.pending():
+            await interaction.followup.send(
+                f"⏳ {self.github.pending()} issue(s) ahead of yours, it will be created shortly..."
+            )
 
-        payload = {
-            "title": title,
-            "body": f"{body}\n\n— Created by **{interaction.user}** via Discord",
-        }
-
-        headers = {
-            "Authorization": f"token {github_token}",
-            "Accept": "application/vnd.github+json",
-            "User-Agent": "MyBusTimesBot",
-        }
+        issue = asyncio.ensure_future(self.github.create_issue(
+            GITHUB_REPO,
+            title,
+            f"{body}\n\n— Created by **{interaction.user}** via Discord",
+        ))
+        send = interaction.followup.send
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.post(api_url, json=payload, headers=headers)
+            # Don't wait on a rate limit we already know outlasts the followup
+            timeout = 0 if self.github.rate_limit.delay() > FOLLOWUP_WAIT_SECONDS else FOLLOWUP_WAIT_SECONDS
+            try:
+                resp = await asyncio.wait_for(asyncio.shield(issue), timeout)
+            except asyncio.TimeoutError:
+                ready_at = int(self.github.rate_limit.ready_at())
+                await interaction.followup.send(
+                    f"⏳ GitHub's rate limit has been reached. Your issue is queued and will be created "
+                    f"around <t:{ready_at}:t>; the result will be posted in this channel."
+                )
+
+                async def send(content):
+                    await interaction.channel.send(f"{interaction.user.mention} {content}")
+
+                resp = await issue
 
             if resp.status_code == 201:
                 issue_data = resp.json()
-                await interaction.followup.send(
+                await send(
                     f"✅ Issue created successfully!\n🔗 {issue_data['html_url']}"
                 )
             elif resp.status_code == 401:
-                await interaction.followup.send("❌ Unauthorized. Check your GitHub token.")
+                await send("❌ Unauthorized. Check your GitHub token.")
             else:
-                await interaction.followup.send(
+                await send(
                     f"❌ Failed to create issue.\nStatus: {resp.status_code}\nResponse: {resp.text}"
                 )
 
         except httpx.RequestError as e:
-            await interaction.followup.send(f"❌ Request failed: {e}")
+            await send(f"❌ Request failed: {e}")
         except Exception as e:
-            await interaction.followup.send(f"❌ Unexpected error: {e}")
+            await send(f"❌ Unexpected error: {e}")
 
 
 async def setup(bot):
     cog = GeneralCog(bot)
-    await cog.fetch_badges()  # Fetch badges at startup
-    await bot.add_cog(cog)
+    await bot.add_cog(cog)  # Badges are fetched at startup by the refresh_badges task
@@ -1,18 +1,63 @@
 import io
+import base64
 import discord
 from discord.ext import commands
 from discord.utils import escape_mentions
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Body
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Body, WebSocket, WebSocketDisconnect
 from datetime import datetime
 from pydantic import BaseModel
 import asyncio
+from utils.memory import current_rss, peak_rss
 
 router = APIRouter()
 
+STREAM_WINDOW = 32  # Unacknowledged commands allowed per /stream connection
+
+
+class StreamCommandError(Exception):
+    pass
+
+
 class ChannelRequest(BaseModel):
     title: str
     content: str = "Discussion started via API"
 
+def build_embed(embed_data):
+    """Convert an embed dict from the website into a discord.Embed."""
+    # Convert dict -> discord.Embed
+    # Escape mentions in embed content to avoid accidental pings
+    embed = discord.Embed(
+        title=escape_mentions(embed_data.get("title")) if embed_data.get("title") else None,
+        description=escape_mentions(embed_data.get("description")) if embed_data.get("description") else None,
+        color=embed_data.get("color", 0x00BFFF)
+    )
+
+    # Add fields
+    for field in embed_data.get("fields", []):
+        name = field.get("name", "Unnamed Field")
+        value = field.get("value", "—")
+        embed.add_field(
+            name=escape_mentions(name),
+            value=escape_mentions(value),
+            inline=field.get("inline", False)
+        )
+
+    # Add footer
+    if "footer" in embed_data:
+        footer_text = embed_data["footer"].get("text")
+        if footer_text:
+            embed.set_footer(text=escape_mentions(footer_text))
+
+    # Add timestamp
+    if "timestamp" in embed_data:
+        try:
+            embed.timestamp = datetime.fromisoformat(embed_data["timestamp"])
+        except Exception:
+            pass
+
+    return embed
+
+
 def setup_routes(bot, guild_id, forum_channel_id, bot_ready_event):
     @router.post("/create-thread")
     async def create_thread(request: ChannelRequest):
@@ -118,36 +163,7 @@ def setup_routes(bot, guild_id, forum_channel_id, bot_ready_event):
         if channel is None:
             raise HTTPException(status_code=404, detail="Channel not found")
 
-        # Convert dict -> discord.Embed
-        # Escape mentions in embed content to avoid accidental pings
-        embed = discord.Embed(
-            title=escape_mentions(embed_data.get("title")) if embed_data.get("title") else None,
-            description=escape_mentions(embed_data.get("description")) if embed_data.get("description") else None,
-            color=embed_data.get("color", 0x00BFFF)
-        )
-
-        # Add fields
-        for field in embed_data.get("fields", []):
-            name = field.get("name", "Unnamed Field")
-            value = field.get("value", "—")
-            embed.add_field(
-                name=escape_mentions(name),
-                value=escape_mentions(value),
-                inline=field.get("inline", False)
-            )
-
-        # Add footer
-        if "footer" in embed_data:
-            footer_text = embed_data["footer"].get("text")
-            if footer_text:
-                embed.set_footer(text=escape_mentions(footer_text))
-
-        # Add timestamp
-        if "timestamp" in embed_data:
-            try:
-                embed.timestamp = datetime.fromisoformat(embed_data["timestamp"])
-            except Exception:
-                pass
+        embed = build_embed(embed_data)
 
         await channel.send(embed=embed)
 
@@ -157,6 +173,75 @@ def setup_routes(bot, guild_id, forum_channel_id, bot_ready_event):
     async def health_check():
         return {"status": "ok"}
 
+    @router.get("/debug/memory")
+    async def debug_memory():
+        """Report gateway cache sizes and process memory, to compare lean and default modes."""
+        connection = bot._connection
+        guilds = [
+            {
+                "id": guild.id,
+                "member_count": guild.member_count,
+                "cached_members": len(guild.members),
+                "channels": len(guild.channels),
+                "threads": len(guild.threads),
+                "voice_states": len(guild._voice_states),
+                "chunked": guild.chunked,
+            }
+            for guild in bot.guilds
+        ]
+
+        cogs = {}
+        vehicle_cog = bot.get_cog("VehicleDetails")
+        if vehicle_cog:
+            cogs["vehicle_cache_entries"] = len(vehicle_cog.cache.entries)
+            cogs["vehicle_cache_bytes"] = vehicle_cog.cache.total_bytes
+            cogs["fleet_index_entries"] = len(vehicle_cog.index)
+        general_cog = bot.get_cog("GeneralCog")
+        if general_cog:
+            cogs["badges"] = len(general_cog.badges)
+        tts_cog = bot.get_cog("TtsCog")
+        if tts_cog:
+            cogs["tts_sessions"] = len(tts_cog.sessions)
+
+        return {
+            "rss_bytes": current_rss(),
+            "peak_rss_bytes": peak_rss(),
+            "users": len(bot.users),
+            "cached_messages": len(bot.cached_messages),
+            "max_messages": connection.max_messages,
+            "member_cache_flags": dict(connection.member_cache_flags),
+            "voice_clients": len(bot.voice_clients),
+            "guilds": guilds,
+            "cogs": cogs,
+        }
+
+    @router.get("/debug/circuits")
+    async def debug_circuits():
+        """Report each MyBusTimes endpoint group's circuit state and concurrency limit, plus deferred mirroring."""
+        # Imported here: main.py imports this module before load_dotenv(), and utils.mbt reads MBT_API_URL
+        from utils.mbt import all_guards
+
+        report = {"circuits": {group: guard.snapshot() for group, guard in all_guards().items()}}
+        forum_cog = bot.get_cog("ForumCog")
+        if forum_cog:
+            report["deferred_threads"] = len(forum_cog.deferred_threads)
+            report["deferred_tickets"] = len(forum_cog.deferred_tickets)
+        return report
+
+    @router.post("/forum-backfill")
+    async def forum_backfill():
+        """Mirror forum messages the website missed, starting from each thread's checkpoint."""
+        await bot_ready_event.wait()
+
+        forum_cog = bot.get_cog("ForumCog")
+        if forum_cog is None:
+            raise HTTPException(status_code=503, detail="Forum mirroring is not loaded")
+        if forum_cog.backfill_lock.locked():
+            raise HTTPException(status_code=409, detail="A backfill is already running")
+
+        sent = await forum_cog.backfill()
+        return {"status": "done", "messages_sent": sent}
+
     @router.post("/send-message-clean")
     async def send_message(
         channel_id: int = Form(...),
@@ -208,6 +293,115 @@ def setup_routes(bot, guild_id, forum_channel_id, bot_ready_event):
 
         return {"status": "sent"}
 
+    @router.websocket("/stream")
+    async def stream(websocket: WebSocket):
+        """
+        Long-lived relay connection. After connecting, the server sends
+        {"type": "hello", "window": 32}, then each JSON command from the client, e.g.
+
+            {"id": "42", "type": "message", "channel_id": 123, "send_by": "user", "message": "Hi"}
+            {"id": "43", "type": "message-clean", "channel_id": 123, "message": "Hi",
+             "image": {"filename": "a.png", "data": "<base64>"}}
+            {"id": "44", "type": "embed", "channel_id": 123, "embed": {...}}
+
+        is answered with {"id": "42", "ok": true, "message_id": 456} or
+        {"id": "42", "ok": false, "error": "Channel not found"}.
+
+        At most "window" commands are in flight; the server stops reading until an
+        ack frees a slot. Commands for the same channel are sent in the order received.
+        """
+        await websocket.accept()
+        await bot_ready_event.wait()
+
+        window = asyncio.Semaphore(STREAM_WINDOW)
+        channel_locks = {}
+        send_lock = asyncio.Lock()
+        pending = set()
+
+        async def ack(reply):
+            async with send_lock:
+                try:
+                    await websocket.send_json(reply)
+                except Exception:
+                    pass  # Client went away; the message itself was still sent
+
+        async def handle(command, lock):
+            reply = {"id": command.get("id")}
+            try:
+                async with lock:
+                    message = await send_stream_command(command)
+                reply.update(ok=True, message_id=message.id)
+            except StreamCommandError as e:
+                reply.update(ok=False, error=str(e))
+            except discord.HTTPException as e:
+                reply.update(ok=False, error=f"Discord error {e.status}: {e.text}")
+            except Exception as e:
+                reply.update(ok=False, error=f"Unexpected error: {e}")
+            finally:
+                window.release()
+            await ack(reply)
+
+        await ack({"type": "hello", "window": STREAM_WINDOW})
+
+        try:
+            while True:
+                await window.acquire()
+                try:
+                    command = await websocket.receive_json()
+                except (WebSocketDisconnect, ValueError, KeyError) as e:
+                    window.release()
+                    if isinstance(e, WebSocketDisconnect):
+                        break
+                    await ack({"ok": False, "error": "Invalid JSON"})
+                    continue
+
+                if not isinstance(command, dict):
+                    window.release()
+                    await ack({"ok": False, "error": "Command must be a JSON object"})
+                    continue
+
+                lock = channel_locks.setdefault(command.get("channel_id"), asyncio.Lock())
+                task = asyncio.create_task(handle(command, lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            # Let sends already accepted finish before the connection state goes away
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def send_stream_command(command):
+        channel_id = command.get("channel_id")
+        channel = bot.get_channel(int(channel_id)) if str(channel_id).isdigit() else None
+        if channel is None:
+            raise StreamCommandError("Channel not found")
+
+        kind = command.get("type", "message")
+        if kind == "embed":
+            if not command.get("embed"):
+                raise StreamCommandError("Missing 'embed'")
+            return await channel.send(embed=build_embed(command["embed"]))
+
+        if kind == "message":
+            content = f"**{command.get('send_by', '')}:** {command.get('message', '')}"
+        elif kind == "message-clean":
+            content = f"{command.get('message', '')}"
+        else:
+            raise StreamCommandError(f"Unknown command type '{kind}'")
+
+        # Escape mentions to prevent pings
+        content = escape_mentions(content)
+
+        image = command.get("image")
+        if image:
+            try:
+                file_data = base64.b64decode(image["data"], validate=True)
+            except Exception:
+                raise StreamCommandError("Invalid image data")
+            discord_file = discord.File(fp=io.BytesIO(file_data), filename=image.get("filename", "image.png"))
+            return await channel.send(content=content, file=discord_file)
+
+        return await channel.send(content=content)
+
     return router
 
 @commands.Cog.listener()
@@ -3,55 +3,130 @@ from discord.ext import commands
 import asyncio
 import pyttsx3
 import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from main import GUILD_ID
 
-class TtsCog(commands.Cog):
-    def __init__(self, bot):
-        self.bot = bot
-        self.tts_engine = pyttsx3.init()
-        self.play_lock = asyncio.Lock()
-        self.synced = False
+TTS_QUEUE_SIZE = 20  # Messages waiting to be spoken per session
+MAX_DISCONNECTS = 3  # Unexpected disconnects before auto-reconnect is disabled
+DEFAULT_RATE = 175
+DEFAULT_VOLUME = 1.0
+
+
+class VoiceSession:
+    """TTS state for one guild: the voice connection, the text channel it reads and its playback queue."""
+
+    def __init__(self, guild_id, text_channel_id):
+        self.guild_id = guild_id
+        self.text_channel_id = text_channel_id
         self.voice_client = None
+        self.queue = asyncio.Queue(maxsize=TTS_QUEUE_SIZE)
+        self.player_task = None
+        self.connection_lock = asyncio.Lock()  # Prevent multiple simultaneous connections
+
+        # Reconnect state
         self.last_disconnect_time = 0
         self.reconnect_attempts = 0
-        self.max_reconnect_attempts = 3
         self.manual_disconnect = False  # Flag to track manual disconnections
-        self.connection_lock = asyncio.Lock()  # Prevent multiple simultaneous connections
         self.auto_reconnect_disabled = False  # Flag to completely disable auto-reconnect
 
-    def get_voice_client(self):
-        for vc in self.bot.voice_clients:
-            if vc.guild.id == self.bot.GUILD_ID:
-                return vc
-        return None
+        # Engine settings
+        self.rate = DEFAULT_RATE
+        self.volume = DEFAULT_VOLUME
+
+    def reset_reconnect(self):
+        self.reconnect_attempts = 0
+        self.auto_reconnect_disabled = False
+        self.manual_disconnect = False
+
+    def record_disconnect(self):
+        """Track an unexpected disconnect. Returns True once auto-reconnect has been disabled."""
+        self.voice_client = None
+        self.last_disconnect_time = asyncio.get_event_loop().time()
+        self.reconnect_attempts += 1
+        if self.reconnect_attempts >= MAX_DISCONNECTS:
+            self.auto_reconnect_disabled = True
+        return self.auto_reconnect_disabled
 
+    def enqueue(self, text):
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+
+class TtsCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.tts_engine = pyttsx3.init()
+        # pyttsx3 shares one engine per process, so synthesis runs on a single worker thread
+        self.tts_executor = ThreadPoolExecutor(max_workers=1)
+        self.synced = False
+        self.sessions = {}  # guild_id -> VoiceSession
+
+    def cog_unload(self):
+        for session in self.sessions.values():
+            if session.player_task:
+                session.player_task.cancel()
+        self.sessions.clear()
+        self.tts_executor.shutdown(wait=False)
+
+    def get_session(self, guild_id, text_channel_id=None):
+        """Return the session for a guild, creating one bound to text_channel_id if given."""
+        session = self.sessions.get(guild_id)
+        if session is None and text_channel_id is not None:
+            session = VoiceSession(guild_id, text_channel_id)
+            session.player_task = asyncio.create_task(self.player_loop(session))
+            self.sessions[guild_id] = session
+        return session
+
+    def close_session(self, guild_id):
+        session = self.sessions.pop(guild_id, None)
+        if session and session.player_task:
+            session.player_task.cancel()
+        return session
+
+    def get_voice_client(self, guild):
+        return guild.voice_client if guild else None
+
+    @discord.app_commands.guilds(discord.Object(id=GUILD_ID))
     @discord.app_commands.command(name="join", description="Join your current voice channel")
     async def join(self, interaction: discord.Interaction):
         # Defer the response to prevent timeout
         await interaction.response.defer()
-        
-        async with self.connection_lock:  # Prevent multiple simultaneous connections
-            if not interaction.user.voice or not interaction.user.voice.channel:
-                await interaction.followup.send("You are not connected to a voice channel!", ephemeral=False)
-                return
 
+        if not interaction.guild:
+            await interaction.followup.send("This command only works in a server!", ephemeral=False)
+            return
+
+        if not interaction.user.voice or not interaction.user.voice.channel:
+            await interaction.followup.send("You are not connected to a voice channel!", ephemeral=False)
+            return
+
+        session = self.get_session(interaction.guild.id, interaction.channel_id)
+
+        async with session.connection_lock:  # Prevent multiple simultaneous connections
             channel = interaction.user.voice.channel
-            voice_client = self.get_voice_client()
+            voice_client = self.get_voice_client(interaction.guild)
+
+            # Read messages from the channel /join was used in
+            session.text_channel_id = interaction.channel_id
 
             # Check if bot is already in the same channel
             if voice_client and voice_client.channel == channel and voice_client.is_connected():
+                session.voice_client = voice_client
                 await interaction.followup.send(f"I'm already in {channel.name}!", ephemeral=False)
                 return
 
             # Reset reconnection attempts and re-enable auto-reconnect when manually joining
-            self.reconnect_attempts = 0
-            self.auto_reconnect_disabled = False
-            self.manual_disconnect = False  # This is a manual connection
+            session.reset_reconnect()
 
             try:
                 # Disconnect from current channel if connected
                 if voice_client and voice_client.is_connected():
                     print(f"Disconnecting from {voice_client.channel} to move to {channel}")
-                    self.manual_disconnect = True
+                    session.manual_disconnect = True
                     await voice_client.disconnect(force=True)
                     await asyncio.sleep(2)  # Give more time for clean disconnection
 
@@ -61,100 +136,128 @@ class TtsCog(commands.Cog):
                 await interaction.followup.send(f"Joined {channel.name}!")
 
                 # Update our reference
-                self.voice_client = voice_client
-                self.manual_disconnect = False
+                session.voice_client = voice_client
+                session.manual_disconnect = False
 
             except Exception as e:
                 print(f"Error joining voice channel: {e}")
                 await interaction.followup.send(f"Failed to join the voice channel: {str(e)}", ephemeral=False)
 
+    @discord.app_commands.guilds(discord.Object(id=GUILD_ID))
     @discord.app_commands.command(name="leave", description="Leave the current voice channel")
     async def leave(self, interaction: discord.Interaction):
         # Defer the response to prevent timeout
         await interaction.response.defer()
-        
-        voice_client = self.get_voice_client()
-        
+
+        voice_client = self.get_voice_client(interaction.guild)
+
         if not voice_client or not voice_client.is_connected():
+            self.close_session(interaction.guild_id)
             await interaction.followup.send("I'm not connected to any voice channel!", ephemeral=False)
             return
-        
+
+        session = self.sessions.get(interaction.guild_id)
+
         try:
             channel_name = voice_client.channel.name
-            self.manual_disconnect = True  # Mark as manual disconnect
+            if session:
+                session.manual_disconnect = True  # Mark as manual disconnect
             await voice_client.disconnect(force=True)
-            self.voice_client = None
-            self.reconnect_attempts = 0  # Reset attempts
-            self.auto_reconnect_disabled = False  # Re-enable for next manual join
+            self.close_session(interaction.guild_id)
             await interaction.followup.send(f"Left {channel_name}!")
         except Exception as e:
             print(f"Error leaving voice channel: {e}")
             await interaction.followup.send(f"Failed to leave the voice channel: {str(e)}", ephemeral=False)
 
+    @discord.app_commands.guilds(discord.Object(id=GUILD_ID))
+    @discord.app_commands.command(name="tts-settings", description="Change the TTS speed and volume for this server")
+    @discord.app_commands.describe(
+        rate="Words per minute (50-400)",
+        volume="Volume from 0.0 to 1.0"
+    )
+    async def tts_settings(
+        self,
+        interaction: discord.Interaction,
+        rate: discord.app_commands.Range[int, 50, 400] = None,
+        volume: discord.app_commands.Range[float, 0.0, 1.0] = None,
+    ):
+        session = self.sessions.get(interaction.guild_id)
+        if not session:
+            await interaction.response.send_message("Use /join first!", ephemeral=True)
+            return
+
+        if rate is not None:
+            session.rate = rate
+        if volume is not None:
+            session.volume = volume
+
+        await interaction.response.send_message(f"TTS rate: {session.rate}, volume: {session.volume}", ephemeral=True)
+
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         # Only handle bot's own voice state changes
-        if member == self.bot.user:
-            print(f"Voice state update: {member.display_name} moved from {before.channel} to {after.channel}")
-            
-            if after.channel is None:
-                # Bot was disconnected from voice
-                print("Bot got disconnected from voice.")
-                
-                if self.manual_disconnect:
-                    print("This was a manual disconnect - not tracking as failure")
-                    self.manual_disconnect = False
-                    self.voice_client = None
-                    return
-                    
-                self.voice_client = None
-                self.last_disconnect_time = asyncio.get_event_loop().time()
-                self.reconnect_attempts += 1
-                
-                # Do not automatically reconnect - only track disconnections
-                print(f"Disconnection #{self.reconnect_attempts}. Not attempting automatic reconnection.")
-                
-                # If we get too many disconnections, disable auto-reconnect completely
-                if self.reconnect_attempts >= 3:
-                    self.auto_reconnect_disabled = True
-                    print("AUTOMATIC RECONNECTION DISABLED due to repeated failures.")
-                    print("This indicates a configuration issue. Please check:")
-                    print("1. Bot has 'Connect' and 'Speak' permissions in the voice channel")
-                    print("2. Voice channel is not full or restricted")
-                    print("3. Bot is not being moved/kicked by server admins or bots")
-                    print("4. Your Discord server doesn't have auto-moderation affecting voice")
-                    print("\nUse /leave and then /join to try connecting again manually.")
-                    
-                    # Forcefully disconnect any remaining voice clients to stop the loop
-                    for vc in self.bot.voice_clients:
-                        if vc.guild.id == self.bot.GUILD_ID:
-                            try:
-                                print(f"Forcefully disconnecting from {vc.channel}")
-                                await vc.disconnect(force=True)
-                            except Exception as e:
-                                print(f"Error forcing disconnect: {e}")
-                    
-                    return
-                    
-            elif before.channel != after.channel and after.channel is not None:
-                # Bot moved to a different channel (successful connection)
-                if self.auto_reconnect_disabled and not self.manual_disconnect:
-                    print("BLOCKING automatic reconnection - auto-reconnect is disabled!")
-                    print("Please use /leave and /join commands to control voice connection manually.")
-                    # Disconnect immediately
+        if member != self.bot.user:
+            return
+
+        session = self.sessions.get(member.guild.id)
+        if session is None:
+            return
+
+        print(f"Voice state update in {member.guild.name}: moved from {before.channel} to {after.channel}")
+
+        if after.channel is None:
+            # Bot was disconnected from voice
+            print(f"Bot got disconnected from voice in {member.guild.name}.")
+
+            if session.manual_disconnect:
+                print("This was a manual disconnect - not tracking as failure")
+                session.manual_disconnect = False
+                session.voice_client = None
+                return
+
+            disabled = session.record_disconnect()
+
+            # Do not automatically reconnect - only track disconnections
+            print(f"Disconnection #{session.reconnect_attempts}. Not attempting automatic reconnection.")
+
+            # If we get too many disconnections, disable auto-reconnect completely
+            if disabled:
+                print("AUTOMATIC RECONNECTION DISABLED due to repeated failures.")
+                print("This indicates a configuration issue. Please check:")
+                print("1. Bot has 'Connect' and 'Speak' permissions in the voice channel")
+                print("2. Voice channel is not full or restricted")
+                print("3. Bot is not being moved/kicked by server admins or bots")
+                print("4. Your Discord server doesn't have auto-moderation affecting voice")
+                print("\nUse /leave and then /join to try connecting again manually.")
+
+                # Forcefully disconnect any remaining voice client to stop the loop
+                vc = self.get_voice_client(member.guild)
+                if vc:
                     try:
-                        voice_client = self.get_voice_client()
-                        if voice_client:
-                            await voice_client.disconnect(force=True)
+                        print(f"Forcefully disconnecting from {vc.channel}")
+                        await vc.disconnect(force=True)
                     except Exception as e:
-                        print(f"Error blocking reconnection: {e}")
-                    return
-                
-                print(f"Bot successfully connected to {after.channel}")
-                self.voice_client = self.get_voice_client()
-            
-            # Update our voice client reference
-            self.voice_client = self.get_voice_client()
+                        print(f"Error forcing disconnect: {e}")
+            return
+
+        if before.channel != after.channel:
+            # Bot moved to a different channel (successful connection)
+            if session.auto_reconnect_disabled and not session.manual_disconnect:
+                print("BLOCKING automatic reconnection - auto-reconnect is disabled!")
+                print("Please use /leave and /join commands to control voice connection manually.")
+                # Disconnect immediately
+                try:
+                    voice_client = self.get_voice_client(member.guild)
+                    if voice_client:
+                        await voice_client.disconnect(force=True)
+                except Exception as e:
+                    print(f"Error blocking reconnection: {e}")
+                return
+
+            print(f"Bot successfully connected to {after.channel}")
+
+        # Update our voice client reference
+        session.voice_client = self.get_voice_client(member.guild)
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -168,42 +271,62 @@ class TtsCog(commands.Cog):
         if message.author == self.bot.user or not message.guild:
             return
 
-        voice_client = self.get_voice_client()
-        if not voice_client or not voice_client.is_connected():
+        session = self.sessions.get(message.guild.id)
+        if not session or message.channel.id != session.text_channel_id:
             return
 
-        if message.content.startswith("/"):  # Ignore commands
+        if message.content.startswith("/") or not message.content:  # Ignore commands
             return
 
-        self.voice_client = voice_client  # ensure voice_client is updated
-
-        await self.read_tts(message.content)
-
-    #async def read_tts(self, text):
-    #    async with self.play_lock:
-    #        try:
-    #            filename = "tts_output.wav"
-    #            self.tts_engine.save_to_file(text, filename)
-    #            self.tts_engine.runAndWait()
-#
-    #            if self.voice_client and self.voice_client.is_playing():
-    #                self.voice_client.stop()
-#
-    #            if self.voice_client and self.voice_client.is_connected():
-    #                source = discord.FFmpegPCMAudio(filename)
-    #                self.voice_client.play(source)
-#
-    #                while self.voice_client.is_playing():
-    #                    await asyncio.sleep(0.1)
-#
-    #        except Exception as e:
-    #            print(f"Error during TTS playback: {e}")
-#
-    #        finally:
-    #            try:
-    #                os.remove(filename)
-    #            except Exception:
-    #                pass
+        voice_client = self.get_voice_client(message.guild)
+        if not voice_client or not voice_client.is_connected():
+            return
+
+        session.voice_client = voice_client  # ensure voice_client is updated
+
+        self.read_tts(session, message.content)
+
+    def read_tts(self, session, text):
+        if not session.enqueue(text):
+            print(f"TTS queue full for guild {session.guild_id}, dropping message")
+
+    def synthesise(self, text, filename, rate, volume):
+        self.tts_engine.setProperty("rate", rate)
+        self.tts_engine.setProperty("volume", volume)
+        self.tts_engine.save_to_file(text, filename)
+        self.tts_engine.runAndWait()
+
+    async def player_loop(self, session):
+        """Speak queued messages for one session, one at a time."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            text = await session.queue.get()
+            fd, filename = tempfile.mkstemp(prefix=f"tts_{session.guild_id}_", suffix=".wav")
+            os.close(fd)
+            try:
+                await loop.run_in_executor(
+                    self.tts_executor, self.synthesise, text, filename, session.rate, session.volume
+                )
+
+                voice_client = session.voice_client
+                if voice_client and voice_client.is_connected():
+                    finished = asyncio.Event()
+                    source = discord.FFmpegPCMAudio(filename)
+                    voice_client.play(source, after=lambda e: loop.call_soon_threadsafe(finished.set))
+                    await finished.wait()
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error during TTS playback: {e}")
+
+            finally:
+                session.queue.task_done()
+                try:
+                    os.remove(filename)
+                except Exception:
+                    pass
 
 async def setup(bot):
     await bot.add_cog(TtsCog(bot))
@@ -2,19 +2,477 @@
 
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 import aiohttp
+import asyncio
+import json
 import logging
+import time
+from bisect import bisect_left
+from collections import Counter, OrderedDict
 from main import GUILD_ID
-from urllib.parse import quote
+from utils.mbt import MBT_API_URL, CircuitOpenError, mbt_guard
+from urllib.parse import urlencode
 
 # Setup logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+FLEET_API_URL = f"{MBT_API_URL}/operator/fleet/"
+PAGE_SIZE = 10
+
+CACHE_TTL = 300  # Seconds a cached answer is served as fresh
+CACHE_STALE_TTL = 1800  # Seconds a stale answer may still be served while it is refreshed
+CACHE_MAX_BYTES = 8 * 1024 * 1024  # Approximate memory limit, measured on raw response bodies
+
+INDEX_PAGE_SIZE = 500  # Vehicles per request when building the autocomplete index
+INDEX_MAX_PAGES = 400
+INDEX_CONCURRENCY = 4
+INDEX_REFRESH_HOURS = 6
+
+
+class FleetAPIError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def normalise_reg(reg):
+    return "".join(reg.split()).upper()
+
+
+class FleetCache:
+    """LRU response cache with request coalescing and stale-while-revalidate."""
+
+    def __init__(self, ttl=CACHE_TTL, stale_ttl=CACHE_STALE_TTL, max_bytes=CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (data, fetched_at, size)
+        self.inflight = {}  # key -> asyncio.Task
+        self.total_bytes = 0
+
+    async def get(self, key, fetch):
+        """Return cached data for key, calling fetch() (returning (data, size)) when needed."""
+        entry = self.entries.get(key)
+        if entry is not None:
+            data, fetched_at, _ = entry
+            age = time.monotonic() - fetched_at
+            if age < self.ttl:
+                self.entries.move_to_end(key)
+                return data
+            if age < self.stale_ttl:
+                # Serve the stale answer now and refresh in the background
+                self.entries.move_to_end(key)
+                self._fetch(key, fetch)
+                return data
+
+        return await asyncio.shield(self._fetch(key, fetch))
+
+    def _fetch(self, key, fetch):
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, fetch))
+            task.add_done_callback(self._consume_exception)
+            self.inflight[key] = task
+        return task
+
+    @staticmethod
+    def _consume_exception(task):
+        # Background refreshes may fail with nobody awaiting them
+        if not task.cancelled():
+            task.exception()
+
+    async def _run(self, key, fetch):
+        try:
+            data, size = await fetch()
+            self.put(key, data, size)
+            return data
+        finally:
+            self.inflight.pop(key, None)
+
+    def put(self, key, data, size):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old[2]
+        if size > self.max_bytes:
+            return
+
+        self.entries[key] = (data, time.monotonic(), size)
+        self.total_bytes += size
+
+        while self.total_bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self.entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def prefix_search(keys, values, prefix, limit, exclude=()):
+    """Return up to limit values whose sorted key starts with prefix."""
+    found = []
+    i = bisect_left(keys, prefix)
+    while i < len(keys) and keys[i].startswith(prefix) and len(found) < limit:
+        if values[i] not in exclude:
+            found.append(values[i])
+        i += 1
+    return found
+
+
+class FleetIndex:
+    """Sorted operator, registration and fleet number lists used for autocomplete."""
+
+    def __init__(self, vehicles=()):
+        operators = {}  # lower-cased name -> display name
+        regs = {}  # normalised reg -> display reg
+        fleet_numbers = {}  # lower-cased operator name -> set of fleet numbers
+        all_fleet_numbers = set()  # includes vehicles with no operator
+
+        for vehicle in vehicles:
+            operator = (vehicle.get("operator") or {}).get("operator_name") or ""
+            operator_key = " ".join(operator.split()).casefold()
+            if operator_key:
+                operators.setdefault(operator_key, operator)
+            if vehicle.get("reg"):
+                regs.setdefault(normalise_reg(vehicle["reg"]), vehicle["reg"])
+            if vehicle.get("fleet_number"):
+                all_fleet_numbers.add(str(vehicle["fleet_number"]))
+                if operator_key:
+                    fleet_numbers.setdefault(operator_key, set()).add(str(vehicle["fleet_number"]))
+
+        self.operator_keys = sorted(operators)
+        self.operator_names = [operators[k] for k in self.operator_keys]
+        self.reg_keys = sorted(regs)
+        self.reg_values = [regs[k] for k in self.reg_keys]
+        self.fleet_numbers = {
+            operator_key: self._sorted_keys(numbers) for operator_key, numbers in fleet_numbers.items()
+        }
+        self.all_fleet_numbers = self._sorted_keys(all_fleet_numbers)
+
+        # Word-start index so "stagecoach" matches "First Stagecoach" as well
+        words = []
+        for i, key in enumerate(self.operator_keys):
+            for word in key.split()[1:]:
+                words.append((word, i))
+        words.sort()
+        self.operator_word_keys = [w for w, _ in words]
+        self.operator_word_ids = [i for _, i in words]
+
+        self.operator_trigrams = {}
+        for i, key in enumerate(self.operator_keys):
+            for gram in trigrams(key):
+                self.operator_trigrams.setdefault(gram, []).append(i)
+
+    @staticmethod
+    def _sorted_keys(values):
+        pairs = sorted((v.upper(), v) for v in values)
+        return [k for k, _ in pairs], [v for _, v in pairs]
+
+    def __len__(self):
+        return len(self.operator_keys) + len(self.reg_keys)
+
+    def match_operators(self, current, limit=25):
+        query = " ".join(current.split()).casefold()
+        if not query:
+            return self.operator_names[:limit]
+
+        ids = prefix_search(self.operator_keys, range(len(self.operator_keys)), query, limit)
+        if len(ids) < limit:
+            ids += prefix_search(self.operator_word_keys, self.operator_word_ids, query, limit - len(ids), set(ids))
+
+        # Fuzzy fallback for typos: rank by shared trigrams
+        if len(ids) < limit and len(query) >= 3:
+            query_grams = trigrams(query)
+            scores = Counter()
+            for gram in query_grams:
+                scores.update(self.operator_trigrams.get(gram, ()))
+            threshold = max(3, len(query_grams) // 2)
+            seen = set(ids)
+            for i, score in scores.most_common():
+                if score < threshold or len(ids) >= limit:
+                    break
+                if i not in seen:
+                    ids.append(i)
+
+        return [self.operator_names[i] for i in ids]
+
+    def canonical_operator(self, operator_name):
+        """The operator's name as the API spells it, e.g. 'stagecoach' -> 'Stagecoach', if indexed."""
+        operator_name = " ".join(operator_name.split())
+        key = operator_name.casefold()
+        i = bisect_left(self.operator_keys, key)
+        if i < len(self.operator_keys) and self.operator_keys[i] == key:
+            return self.operator_names[i]
+        return operator_name
+
+    def canonical_reg(self, reg):
+        """The registration as the API stores it, e.g. 'ab12cde' -> 'AB12 CDE', if indexed."""
+        key = normalise_reg(reg)
+        i = bisect_left(self.reg_keys, key)
+        if i < len(self.reg_keys) and self.reg_keys[i] == key:
+            return self.reg_values[i]
+        return reg.strip()
+
+    def match_regs(self, current, limit=25):
+        return prefix_search(self.reg_keys, self.reg_values, normalise_reg(current), limit)
+
+    def match_fleet_numbers(self, current, operator_name="", limit=25):
+        operator_key = " ".join(operator_name.split()).casefold()
+        if operator_key:
+            keys, values = self.fleet_numbers.get(operator_key, self.all_fleet_numbers)
+        else:
+            keys, values = self.all_fleet_numbers
+        return prefix_search(keys, values, current.strip().upper(), limit)
+
+
+def build_vehicle_embed(vehicle, reg, fleet_number, operator_name):
+    # Build description based on provided search params
+    description = "Result for"
+    if reg:
+        description += f", Reg: `{reg}`"
+    if fleet_number:
+        description += f", Fleet Number: `{fleet_number}`"
+    if operator_name:
+        description += f", Operator: `{operator_name}`"
+
+    embed = discord.Embed(
+        title="Vehicle Details",
+        description=description,
+        color=discord.Color.blue()
+    )
+
+    # Inline Group 1
+    embed.add_field(name="Fleet Number", value=vehicle.get("fleet_number", "N/A"), inline=True)
+    embed.add_field(name="Registration", value=vehicle.get("reg", "N/A"), inline=True)
+    embed.add_field(name="\u200b", value="\u200b", inline=True)  # Spacer
+
+    # Inline Group 2
+    vehicle_type = vehicle.get("vehicle_type_data", {})
+    embed.add_field(name="Type Name", value=vehicle_type.get("type_name", "N/A"), inline=True)
+    embed.add_field(name="Double Decker", value=str(vehicle_type.get("double_decker", "N/A")), inline=True)
+    embed.add_field(name="\u200b", value="\u200b", inline=True)
+
+    # Inline Group 3
+    embed.add_field(name="Type", value=vehicle_type.get("type", "N/A"), inline=True)
+    embed.add_field(name="Fuel", value=vehicle_type.get("fuel", "N/A"), inline=True)
+    embed.add_field(name="\u200b", value="\u200b", inline=True)
+
+    # Operator
+    operator = vehicle.get("operator", {})
+
+    # Link
+    link = f"https://www.mybustimes.cc/operator/{operator.get('operator_slug', 'N/A')}/vehicles/{vehicle.get('id', 'N/A')}/"
+    embed.add_field(name="More Info", value=f"[Click here]({link})", inline=False)
+
+    return embed
+
+
+class VehicleResultsView(discord.ui.View):
+    """Shows one vehicle at a time, loading API pages only as the user reaches them."""
+
+    def __init__(self, cog, user_id, query, first_page):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.user_id = user_id
+        self.query = query  # (reg, fleet_number, operator_name) as typed
+        self.pages = {0: first_page.get("results", [])}  # offset -> vehicles
+        self.total = first_page.get("count", len(self.pages[0]))
+        self.loading = {}  # offset -> asyncio.Task
+        self.embeds = {}  # position -> rendered embed
+        self.position = 0
+        self.message = None
+
+    def load_page(self, offset):
+        if offset in self.pages:
+            return None
+        task = self.loading.get(offset)
+        if task is None:
+            task = asyncio.create_task(self.cog.fetch_fleet(*self.query, offset=offset))
+            self.loading[offset] = task
+        return task
+
+    def prefetch(self, offset):
+        if offset < self.total and offset not in self.pages:
+            self.load_page(offset).add_done_callback(self._store_page(offset))
+
+    def _store_page(self, offset):
+        def done(task):
+            self.loading.pop(offset, None)
+            if not task.cancelled() and task.exception() is None:
+                self.pages[offset] = task.result().get("results", [])
+            elif not task.cancelled():
+                logger.warning("Prefetch of fleet offset %d failed: %s", offset, task.exception())
+        return done
+
+    async def render(self, position):
+        embed = self.embeds.get(position)
+        if embed is None:
+            offset = position - position % PAGE_SIZE
+            if offset not in self.pages:
+                try:
+                    self.pages[offset] = (await self.load_page(offset)).get("results", [])
+                finally:
+                    self.loading.pop(offset, None)
+
+            page = self.pages[offset]
+            if position - offset >= len(page):
+                # The result set shrank since the first page was fetched
+                self.total = offset + len(page)
+                position = max(self.total - 1, 0)
+                return await self.render(position)
+
+            embed = build_vehicle_embed(page[position - offset], *self.query)
+            embed.set_footer(text=f"Result {position + 1} of {self.total}")
+            self.embeds[position] = embed
+
+            # Have the next page ready before the user gets to it
+            self.prefetch(offset + PAGE_SIZE)
+
+        self.position = position
+        return embed
+
+    def update_buttons(self):
+        self.previous_button.disabled = self.position <= 0
+        self.next_button.disabled = self.position >= self.total - 1
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("Run /vehicle-details to search for yourself.", ephemeral=True)
+            return False
+        return True
+
+    async def show(self, interaction, position):
+        # Acknowledge first: render may have to fetch a page, which can outlast Discord's 3 s deadline
+        await interaction.response.defer()
+        try:
+            embed = await self.render(position)
+        except Exception as e:
+            logger.exception("Failed to load vehicle result %d", position)
+            await interaction.followup.send(f"An error occurred: {str(e)}", ephemeral=True)
+            return
+        self.update_buttons()
+        await interaction.edit_original_response(embed=embed, view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.position - 1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.primary)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.position + 1)
+
+    async def on_timeout(self):
+        for task in self.loading.values():
+            task.cancel()
+        self.embeds.clear()
+        self.pages.clear()
+        if self.message:
+            for item in self.children:
+                item.disabled = True
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+
 class VehicleDetails(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.session = None
+        self.cache = FleetCache()
+        self.index = FleetIndex()
+
+    async def cog_load(self):
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        self.refresh_index.start()
+
+    async def cog_unload(self):
+        self.refresh_index.cancel()
+        if self.session:
+            await self.session.close()
+
+    async def fetch_index_page(self, offset):
+        params = {"limit": INDEX_PAGE_SIZE, "offset": offset}
+        async with mbt_guard("fleet-index").call() as call:
+            async with self.session.get(
+                f"{FLEET_API_URL}?{urlencode(params)}", timeout=aiohttp.ClientTimeout(total=60)
+            ) as resp:
+                status = resp.status
+                body = await resp.read() if status == 200 else None
+            if status >= 500:
+                call.fail()
+        if status != 200:
+            raise FleetAPIError(status)
+        return json.loads(body)
+
+    @tasks.loop(hours=INDEX_REFRESH_HOURS)
+    async def refresh_index(self):
+        """Rebuild the autocomplete index from bulk pages of the fleet API."""
+        if mbt_guard("fleet-index").is_open():
+            logger.warning("Skipping fleet index refresh while the fleet index circuit is open")
+            return
+        try:
+            first = await self.fetch_index_page(0)
+            vehicles = list(first.get("results", []))
+            # Step by what the API actually returned, in case it caps limit below INDEX_PAGE_SIZE
+            page_size = len(vehicles) or INDEX_PAGE_SIZE
+            if page_size < INDEX_PAGE_SIZE:
+                logger.warning("Fleet API returned %d vehicles per page, asked for %d", page_size, INDEX_PAGE_SIZE)
+            count = min(first.get("count", len(vehicles)), page_size * INDEX_MAX_PAGES)
+
+            semaphore = asyncio.Semaphore(INDEX_CONCURRENCY)
+
+            async def fetch(offset):
+                async with semaphore:
+                    return await self.fetch_index_page(offset)
+
+            offsets = range(page_size, count, page_size)
+            pages = await asyncio.gather(*(fetch(o) for o in offsets))
+            for offset, page in zip(offsets, pages):
+                results = page.get("results", [])
+                if len(results) < min(page_size, count - offset):
+                    logger.warning("Fleet index page at offset %d came back short (%d vehicles)", offset, len(results))
+                vehicles.extend(results)
+
+            self.index = FleetIndex(vehicles)
+            logger.info("Built fleet index from %d vehicles (%d entries)", len(vehicles), len(self.index))
+        except Exception:
+            logger.exception("Failed to refresh fleet index; keeping the previous one")
+
+    async def fetch_fleet(self, reg, fleet_number, operator_name, offset=0):
+        """Fetch one page of fleet results, served from the cache where possible.
+
+        The query is spelled the way the API stores it where the index knows the vehicle or
+        operator, and the cache is keyed on exactly what is sent, so spellings the API treats
+        differently never share an answer.
+        """
+        reg = self.index.canonical_reg(reg)
+        fleet_number = fleet_number.strip()
+        operator_name = self.index.canonical_operator(operator_name)
+        key = (reg, fleet_number, operator_name, offset)
+
+        async def fetch():
+            params = {
+                "operator__operator_name": operator_name,
+                "fleet_number": fleet_number,
+                "reg": reg,
+                "limit": PAGE_SIZE,
+                "offset": offset,
+            }
+            async with mbt_guard("fleet").call() as call:
+                async with self.session.get(f"{FLEET_API_URL}?{urlencode(params)}") as resp:
+                    status = resp.status
+                    body = await resp.read() if status == 200 else None
+                if status >= 500:
+                    call.fail()
+            if status != 200:
+                raise FleetAPIError(status)
+            return json.loads(body), len(body)
+
+        return await self.cache.get(key, fetch)
 
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     @app_commands.command(name="vehicle-details", description="Search for vehicle details by reg, fleet number, or operator name.")
@@ -32,19 +490,14 @@ class VehicleDetails(commands.Cog):
     ):
         await interaction.response.defer(thinking=True)
 
-        url = (
-            f"https://www.mybustimes.cc/api/operator/fleet/"
-            f"?operator__operator_name={operator_name}&fleet_number={fleet_number}&reg={reg}&limit=10"
-        )
-
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as resp:
-                    if resp.status != 200:
-                        await interaction.followup.send(f"Failed to fetch data (HTTP {resp.status})")
-                        return
-
-                    json_data = await resp.json()
+            json_data = await self.fetch_fleet(reg, fleet_number, operator_name)
+        except FleetAPIError as e:
+            await interaction.followup.send(f"Failed to fetch data (HTTP {e.status})")
+            return
+        except CircuitOpenError:
+            await interaction.followup.send("MyBusTimes isn't responding right now, please try again in a minute.")
+            return
         except Exception as e:
             logger.exception("Exception occurred while fetching vehicle details")
             await interaction.followup.send(f"An error occurred: {str(e)}")
@@ -55,51 +508,30 @@ class VehicleDetails(commands.Cog):
             await interaction.followup.send("No vehicle found with the given details.")
             return
 
-        embeds = []
-        for vehicle in results:
-
-            # Build description based on provided search params
-            description = "Result for"
-            if reg:
-                description += f", Reg: `{reg}`"
-            if fleet_number:
-                description += f", Fleet Number: `{fleet_number}`"
-            if operator_name:
-                description += f", Operator: `{operator_name}`"
-
-            embed = discord.Embed(
-                title="Vehicle Details",
-                description=description,
-                color=discord.Color.blue()
-            )
-
-            # Inline Group 1
-            embed.add_field(name="Fleet Number", value=vehicle.get("fleet_number", "N/A"), inline=True)
-            embed.add_field(name="Registration", value=vehicle.get("reg", "N/A"), inline=True)
-            embed.add_field(name="\u200b", value="\u200b", inline=True)  # Spacer
-
-            # Inline Group 2
-            vehicle_type = vehicle.get("vehicle_type_data", {})
-            embed.add_field(name="Type Name", value=vehicle_type.get("type_name", "N/A"), inline=True)
-            embed.add_field(name="Double Decker", value=str(vehicle_type.get("double_decker", "N/A")), inline=True)
-            embed.add_field(name="\u200b", value="\u200b", inline=True)
-
-            # Inline Group 3
-            embed.add_field(name="Type", value=vehicle_type.get("type", "N/A"), inline=True)
-            embed.add_field(name="Fuel", value=vehicle_type.get("fuel", "N/A"), inline=True)
-            embed.add_field(name="\u200b", value="\u200b", inline=True)
-
-            # Operator
-            operator = vehicle.get("operator", {})
-            
-            # Link
-            link = f"https://www.mybustimes.cc/operator/{operator.get('operator_slug', 'N/A')}/vehicles/{vehicle.get('id', 'N/A')}/"
-            embed.add_field(name="More Info", value=f"[Click here]({link})", inline=False)
-
-            embeds.append(embed)
-
-        # Send all embeds — Discord has a limit of 10 embeds per message
-        await interaction.followup.send(embeds=embeds[:10])
+        view = VehicleResultsView(self, interaction.user.id, (reg, fleet_number, operator_name), json_data)
+        embed = await view.render(0)
+        if view.total == 1:
+            await interaction.followup.send(embed=embed)
+            return
+
+        view.update_buttons()
+        view.message = await interaction.followup.send(embed=embed, view=view)
+
+    @vehicle_details.autocomplete("operator_name")
+    async def operator_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [app_commands.Choice(name=n[:100], value=n[:100]) for n in self.index.match_operators(current)]
+
+    @vehicle_details.autocomplete("reg")
+    async def reg_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [app_commands.Choice(name=r, value=r) for r in self.index.match_regs(current)]
+
+    @vehicle_details.autocomplete("fleet_number")
+    async def fleet_number_autocomplete(self, interaction: discord.Interaction, current: str):
+        operator_name = getattr(interaction.namespace, "operator_name", "") or ""
+        return [
+            app_commands.Choice(name=n, value=n)
+            for n in self.index.match_fleet_numbers(current, operator_name)
+        ]
 
 
 async def setup(bot):
@@ -5,7 +5,6 @@ from discord.ext import commands
 from dotenv import load_dotenv
 from fastapi import FastAPI
 import uvicorn
-from cogs.forum import ForumCog
 from cogs.messaging import setup_routes
 
 load_dotenv()
@@ -13,6 +12,11 @@ TOKEN = os.getenv("DISCORD_TOKEN")
 GUILD_ID = int(os.getenv("GUILD_ID"))
 FORUM_CHANNEL_ID = int(os.getenv("FORUM_CHANNEL_ID"))
 
+# Lean mode keeps only what the cogs use: members are not chunked or cached (join events
+# still arrive), only members in voice are cached for TTS, and the message cache is small.
+LEAN_MEMORY = os.getenv("LEAN_MEMORY", "0") == "1"
+MESSAGE_CACHE_SIZE = int(os.getenv("MESSAGE_CACHE_SIZE", 100 if LEAN_MEMORY else 1000))
+
 intents = discord.Intents.default()
 intents.guilds = True
 intents.guild_messages = True
@@ -20,7 +24,16 @@ intents.message_content = True
 intents.voice_states = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+if LEAN_MEMORY:
+    bot = commands.Bot(
+        command_prefix="!",
+        intents=intents,
+        member_cache_flags=discord.MemberCacheFlags(voice=True, joined=False),
+        chunk_guilds_at_startup=False,
+        max_messages=MESSAGE_CACHE_SIZE or None,
+    )
+else:
+    bot = commands.Bot(command_prefix="!", intents=intents, max_messages=MESSAGE_CACHE_SIZE or None)
 bot_ready = asyncio.Event()
 
 app = FastAPI()
@@ -0,0 +1,69 @@
+"""GitHubClient against the stand-in in tools/fake_github.py, served in-process over ASGI."""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("fastapi")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+from fake_github import create_app  # noqa: E402
+from utils.github import GitHubClient  # noqa: E402
+
+
+class RecordingTransport(httpx.ASGITransport):
+    def __init__(self, app):
+        super().__init__(app=app)
+        self.statuses = []
+
+    async def handle_async_request(self, request):
+        response = await super().handle_async_request(request)
+        self.statuses.append(response.status_code)
+        return response
+
+
+def github_client(transport):
+    return GitHubClient("test-token", base_url="http://github.test", transport=transport)
+
+
+def test_create_issue_waits_for_rate_limit_reset():
+    async def run():
+        app = create_app(limit=1, window=1.0)
+
+        # Use up the window, then ask from a client that hasn't seen the rate limit headers yet
+        first = github_client(RecordingTransport(app))
+        await first.create_issue("owner/repo", "First", "body")
+        await first.close()
+
+        transport = RecordingTransport(app)
+        client = github_client(transport)
+        try:
+            response = await asyncio.wait_for(client.create_issue("owner/repo", "Second", "body"), 10)
+        finally:
+            await client.close()
+        return transport.statuses, response
+
+    statuses, response = asyncio.run(run())
+    assert statuses == [403, 201]
+    assert response.json()["number"] == 2
+
+
+def test_post_is_not_retried_on_server_error():
+    async def run():
+        transport = RecordingTransport(create_app(fail_rate=1.0))
+        client = github_client(transport)
+        try:
+            response = await client.create_issue("owner/repo", "Title", "body")
+        finally:
+            await client.close()
+        return transport.statuses, response
+
+    statuses, response = asyncio.run(run())
+    assert statuses == [502]
+    assert response.status_code == 502
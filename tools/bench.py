@@ -0,0 +1,272 @@
+"""End-to-end benchmarks for the bot's MyBusTimes paths against a local API stand-in.
+
+Starts tools/fake_mbt.py in-process, loads the real cogs on a BenchBot and drives them
+with synthetic events, then reports throughput, p50/p99 latency and memory per scenario:
+
+    python tools/bench.py --latency 0.05 --concurrency 20 --save before.json
+    # ...make a change...
+    python tools/bench.py --latency 0.05 --concurrency 20 --compare before.json
+
+Nothing talks to Discord or the real website.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord import free_port  # noqa: E402
+from utils.memory import current_rss  # noqa: E402
+
+BENCH_GUILD_ID = 100000000000000001
+BENCH_USER_ID = 100000000000000002
+BOT_USER_ID = 100000000000000003
+
+SCENARIOS = ("forum_on_message", "vehicle_details", "vehicle_autocomplete", "badge_autocomplete", "badge_command")
+
+
+def configure_environment(port):
+    """Point the cogs at the stand-in. Must run before any cog module is imported."""
+    os.environ["MBT_API_URL"] = f"http://127.0.0.1:{port}/api"
+    os.environ.setdefault("DISCORD_TOKEN", "bench")
+    os.environ["GUILD_ID"] = str(BENCH_GUILD_ID)
+    os.environ.setdefault("FORUM_CHANNEL_ID", "1")
+    os.environ["FORUM_CHECKPOINT_FILE"] = os.path.join(tempfile.mkdtemp(), "checkpoints.json")
+    os.environ["ALLOWED_USER_IDS"] = str(BENCH_USER_ID)
+    os.environ["Username"] = "bench"
+    os.environ["Password"] = "bench"
+
+
+class Result:
+    def __init__(self, name, latencies, errors, wall, peak_bytes, rss_delta):
+        self.name = name
+        self.latencies = latencies
+        self.errors = errors
+        self.wall = wall
+        self.peak_bytes = peak_bytes
+        self.rss_delta = rss_delta
+
+    def summary(self):
+        ordered = sorted(self.latencies)
+        quantiles = statistics.quantiles(ordered, n=100) if len(ordered) > 1 else ordered * 99
+        return {
+            "ops": len(ordered),
+            "errors": self.errors,
+            "ops_per_sec": len(ordered) / self.wall if self.wall else 0.0,
+            "p50_ms": quantiles[49] * 1000 if quantiles else 0.0,
+            "p99_ms": quantiles[98] * 1000 if quantiles else 0.0,
+            "peak_alloc_kb": self.peak_bytes / 1024,
+            "rss_delta_kb": (self.rss_delta or 0) / 1024,
+        }
+
+
+async def run_scenario(name, operations, concurrency, trace_memory):
+    """Await every operation() with at most concurrency in flight, timing each one."""
+    latencies = []
+    errors = 0
+    queue = list(operations)
+    queue.reverse()
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            operation = queue.pop()
+            start = time.perf_counter()
+            try:
+                await operation()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    rss_before = current_rss()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    rss_after = current_rss()
+    rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+
+    return Result(name, latencies, errors, wall, peak, rss_delta)
+
+
+async def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("Timed out waiting for the bench setup")
+        await asyncio.sleep(0.05)
+
+
+async def run(args):
+    import uvicorn
+    import fake_mbt
+    from fake_discord import BenchAttachment, BenchBot, BenchForum, BenchGuild, BenchInteraction, BenchMessage, BenchThread, BenchUser
+
+    app = fake_mbt.create_app(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, fleet_size=args.fleet_size
+    )
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning", loop="asyncio"))
+    server_task = asyncio.create_task(server.serve())
+    await wait_for(lambda: server.started)
+
+    from cogs.forum import ALLOWED_FORUM_IDS, ForumCog
+    from cogs.general import GeneralCog
+    from cogs.vehicle_details import VehicleDetails
+
+    bot_user = BenchUser(BOT_USER_ID, "JessBot")
+    user = BenchUser(BENCH_USER_ID, "bench-user")
+    guild = BenchGuild(BENCH_GUILD_ID)
+    bot = BenchBot(bot_user, [guild])
+
+    forum = guild.add_channel(BenchForum(ALLOWED_FORUM_IDS[0], guild))
+    threads = [guild.add_channel(BenchThread(900000000000000000 + i, forum, guild)) for i in range(args.threads)]
+
+    forum_cog = ForumCog(bot, BENCH_GUILD_ID, forum.id, asyncio.Event())
+    vehicle_cog = VehicleDetails(bot)
+    general_cog = GeneralCog(bot)
+    for cog in (forum_cog, vehicle_cog, general_cog):
+        bot.cogs[type(cog).__name__] = cog
+    await vehicle_cog.cog_load()
+    await general_cog.cog_load()
+    await wait_for(lambda: len(vehicle_cog.index) and len(general_cog.badges))
+
+    rng = random.Random(args.seed)
+    fleet = app.state.fleet
+    popular = [rng.choice(fleet) for _ in range(max(1, args.vehicle_queries // 10))]
+    operator_names = sorted({v["operator"]["operator_name"] for v in fleet})
+
+    def forum_message(i):
+        thread = threads[i % len(threads)]
+        attachments = []
+        if args.attachment_every and i % args.attachment_every == 0:
+            attachments = [BenchAttachment()]
+
+        async def post():
+            # Posted when the operation runs, so thread history only holds messages already delivered
+            await forum_cog.on_message(BenchMessage(thread, user, f"Bench message {i}", attachments))
+        return post
+
+    def vehicle_lookup(_):
+        # Most lookups repeat a popular vehicle, as during an event
+        vehicle = rng.choice(popular) if rng.random() < 0.8 else rng.choice(fleet)
+        interaction = BenchInteraction(user, guild)
+        return lambda: vehicle_cog.vehicle_details.callback(vehicle_cog, interaction, reg=vehicle["reg"])
+
+    def operator_autocomplete(_):
+        name = rng.choice(operator_names)
+        prefix = name[:rng.randint(1, len(name))].lower()
+        interaction = BenchInteraction(user, guild)
+        return lambda: vehicle_cog.operator_autocomplete(interaction, prefix)
+
+    def badge_autocomplete(_):
+        interaction = BenchInteraction(user, guild)
+        return lambda: general_cog.badge_autocomplete(interaction, f"badge {rng.randint(0, 20)}")
+
+    def badge_command(i):
+        interaction = BenchInteraction(user, guild)
+        return lambda: general_cog.badge.callback(general_cog, interaction, f"user{i}", "Badge 001", True)
+
+    scenarios = {
+        "forum_on_message": (forum_message, args.messages),
+        "vehicle_details": (vehicle_lookup, args.vehicle_queries),
+        "vehicle_autocomplete": (operator_autocomplete, args.autocomplete_queries),
+        "badge_autocomplete": (badge_autocomplete, args.autocomplete_queries),
+        "badge_command": (badge_command, args.badge_commands),
+    }
+    selected = args.scenario or SCENARIOS
+
+    results = {}
+    try:
+        for name in selected:
+            build, count = scenarios[name]
+            result = await run_scenario(name, [build(i) for i in range(count)], args.concurrency, args.trace_memory)
+            results[name] = result.summary()
+    finally:
+        await vehicle_cog.cog_unload()
+        await general_cog.cog_unload()
+        server.should_exit = True
+        await server_task
+
+    results["_api_requests"] = dict(app.state.stats)
+    return results
+
+
+def print_results(results, baseline=None):
+    columns = ["ops", "errors", "ops_per_sec", "p50_ms", "p99_ms", "peak_alloc_kb", "rss_delta_kb"]
+    print(f"{'scenario':<22}" + "".join(f"{c:>15}" for c in columns))
+    for name, summary in results.items():
+        if name.startswith("_"):
+            continue
+        print(f"{name:<22}" + "".join(f"{summary[c]:>15.2f}" for c in columns))
+        if summary["errors"]:
+            failed = "ALL" if summary["errors"] >= summary["ops"] else summary["errors"]
+            print(f"  !! {failed} of {summary['ops']} ops failed; timings include failed calls")
+        if baseline and name in baseline:
+            changes = []
+            for c in columns:
+                before = baseline[name].get(c)
+                if before:
+                    changes.append(f"{(summary[c] - before) / before * 100:>+14.1f}%")
+                else:
+                    changes.append(f"{'-':>15}")
+            print(f"{'  vs baseline':<22}" + "".join(changes))
+
+    print("\nAPI requests made:")
+    for route, count in sorted(results["_api_requests"].items()):
+        print(f"  {route:<40}{count:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="run only this scenario (repeatable)")
+    parser.add_argument("--port", type=int, default=0, help="port for the API stand-in (default: any free port)")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the stand-in adds to each request")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--fleet-size", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=25, help="forum threads messages are spread across")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--attachment-every", type=int, default=10, help="attach an image to every Nth message (0 = never)")
+    parser.add_argument("--vehicle-queries", type=int, default=500)
+    parser.add_argument("--autocomplete-queries", type=int, default=5000)
+    parser.add_argument("--badge-commands", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trace-memory", action="store_true", help="record peak Python allocations (slower)")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against results saved with --save")
+    args = parser.parse_args()
+
+    args.port = args.port or free_port()
+    configure_environment(args.port)
+
+    results = asyncio.run(run(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
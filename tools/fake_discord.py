@@ -0,0 +1,250 @@
+"""Minimal stand-ins for the discord.py objects the cogs touch, for benchmarks and load tests.
+
+Only the attributes and coroutines the bot actually uses are provided; nothing here talks
+to Discord.
+"""
+
+import asyncio
+import itertools
+import socket
+import time
+from collections import deque
+
+import discord
+
+_snowflakes = itertools.count()
+
+
+def free_port():
+    """A localhost port nothing is listening on, for the in-process servers the tools start."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def next_snowflake():
+    """Increasing snowflake IDs, so checkpoints and ordering behave as they would live."""
+    return discord.utils.time_snowflake(discord.utils.utcnow()) + next(_snowflakes)
+
+
+class BenchUser:
+    def __init__(self, user_id, name):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.voice = None
+
+    def __str__(self):
+        return self.name
+
+    def __eq__(self, other):
+        return isinstance(other, BenchUser) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class BenchGuild:
+    def __init__(self, guild_id, name="Bench Guild"):
+        self.id = guild_id
+        self.name = name
+        self.channels = {}
+        self.voice_client = None
+
+    def add_channel(self, channel):
+        self.channels[channel.id] = channel
+        return channel
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+
+class BenchForum:
+    """Parent of BenchThread; ForumCog only reads its ID."""
+
+    def __init__(self, forum_id, guild):
+        self.id = forum_id
+        self.guild = guild
+        self.name = f"forum-{forum_id}"
+
+
+class BenchThread(discord.Thread):
+    """A real discord.Thread subclass so ForumCog's isinstance checks pass."""
+
+    def __init__(self, thread_id, forum, guild):
+        self.id = thread_id
+        self.parent_id = forum.id
+        self.guild = guild
+        self.name = f"Bench thread {thread_id}"
+        self.last_message_id = None
+        self.messages = []  # every BenchMessage posted here, oldest first
+
+    async def history(self, limit=100, after=None, oldest_first=None, **kwargs):
+        """The messages posted so far, like discord.Thread.history with after= and oldest_first=."""
+        messages = [m for m in self.messages if after is None or m.id > after.id]
+        if oldest_first is False or (oldest_first is None and after is None):
+            messages.reverse()
+        for message in messages[:limit] if limit else messages:
+            yield message
+
+
+class BenchAttachment:
+    def __init__(self, filename="bench.png", size=64 * 1024):
+        self.filename = filename
+        self.content_type = "image/png"
+        self._data = b"\0" * size
+
+    async def read(self):
+        return self._data
+
+
+class BenchMessage:
+    def __init__(self, channel, author, content, attachments=()):
+        self.id = next_snowflake()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.attachments = list(attachments)
+        self.embeds = []
+        channel.last_message_id = self.id
+        if isinstance(channel, BenchThread):
+            channel.messages.append(self)
+
+
+class SendRateLimit:
+    """Sliding-window limit like Discord's per-channel send limit; callers wait rather than get a 429."""
+
+    def __init__(self, count, per):
+        self.count = count
+        self.per = per
+        self.sent = deque()
+        self.waits = 0
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            while self.sent and now - self.sent[0] >= self.per:
+                self.sent.popleft()
+            if len(self.sent) < self.count:
+                self.sent.append(now)
+                return
+            self.waits += 1
+            await asyncio.sleep(self.sent[0] + self.per - now)
+
+
+class BenchTextChannel:
+    """A text channel whose send() takes send_delay seconds and honours an optional rate limit."""
+
+    def __init__(self, channel_id, guild, send_delay=0.0, rate_limit=None):
+        self.id = channel_id
+        self.guild = guild
+        self.name = f"channel-{channel_id}"
+        self.send_delay = send_delay
+        self.rate_limit = rate_limit
+        self.last_message_id = None
+        self.sent = 0
+        self.uploaded_bytes = 0
+
+    async def send(self, content=None, **kwargs):
+        if self.rate_limit:
+            await self.rate_limit.acquire()
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+
+        file = kwargs.get("file")
+        if file is not None:
+            self.uploaded_bytes += len(file.fp.read())
+
+        message = BenchSentMessage(content, kwargs)
+        self.last_message_id = message.id
+        self.sent += 1
+        return message
+
+
+class BenchResponse:
+    def __init__(self):
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, *args, **kwargs):
+        self._done = True
+
+    async def edit_message(self, **kwargs):
+        self._done = True
+
+
+class BenchFollowup:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        message = BenchSentMessage(content, kwargs)
+        self.sent.append(message)
+        return message
+
+
+class BenchSentMessage:
+    def __init__(self, content, kwargs):
+        self.id = next_snowflake()
+        self.content = content
+        self.embeds = kwargs.get("embeds") or ([kwargs["embed"]] if kwargs.get("embed") else [])
+
+    async def edit(self, **kwargs):
+        return self
+
+
+class BenchNamespace:
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+
+class BenchInteraction:
+    """Just enough of discord.Interaction for slash command and autocomplete callbacks."""
+
+    def __init__(self, user, guild=None, channel_id=None, **namespace):
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id if guild else None
+        self.channel_id = channel_id
+        self.created_at = time.time()
+        self.response = BenchResponse()
+        self.followup = BenchFollowup()
+        self.namespace = BenchNamespace(**namespace)
+
+
+class BenchBot:
+    """Stands in for commands.Bot with only the pieces the cogs call."""
+
+    def __init__(self, user, guilds=()):
+        self.user = user
+        self.guilds = list(guilds)
+        self.voice_clients = []
+        self.cogs = {}
+
+    def add_guild(self, guild):
+        self.guilds.append(guild)
+        return guild
+
+    def get_guild(self, guild_id):
+        return next((g for g in self.guilds if g.id == guild_id), None)
+
+    def get_channel(self, channel_id):
+        for guild in self.guilds:
+            channel = guild.get_channel(channel_id)
+            if channel is not None:
+                return channel
+        return None
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+    async def process_commands(self, message):
+        pass
@@ -0,0 +1,76 @@
+"""Local stand-in for the GitHub issues API, for trying out /github-issue without touching GitHub.
+
+Run it and point the bot at it:
+
+    python tools/fake_github.py --port 8090 --limit 5 --window 30 --fail-rate 0.2
+    GITHUB_API_URL=http://localhost:8090 python main.py
+
+It sends the same X-RateLimit-* headers as GitHub, answers 403 once the limit for the
+window is used up, and fails a share of requests with a 502 so the error path gets used.
+"""
+
+import argparse
+import itertools
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_app(limit=60, window=60.0, fail_rate=0.0):
+    app = FastAPI()
+    state = {"reset_at": time.time() + window, "used": 0, "issues": []}
+    numbers = itertools.count(1)
+
+    def rate_limit_headers():
+        return {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(max(limit - state["used"], 0)),
+            "X-RateLimit-Reset": str(int(state["reset_at"])),
+        }
+
+    @app.post("/repos/{owner}/{repo}/issues")
+    async def create_issue(owner: str, repo: str, request: Request):
+        if time.time() >= state["reset_at"]:
+            state["reset_at"] = time.time() + window
+            state["used"] = 0
+
+        if state["used"] >= limit:
+            return JSONResponse(
+                {"message": "API rate limit exceeded"}, status_code=403, headers=rate_limit_headers()
+            )
+        state["used"] += 1
+
+        if random.random() < fail_rate:
+            return JSONResponse({"message": "Server Error"}, status_code=502, headers=rate_limit_headers())
+
+        payload = await request.json()
+        number = next(numbers)
+        issue = {
+            "number": number,
+            "title": payload.get("title"),
+            "body": payload.get("body"),
+            "html_url": f"http://localhost/{owner}/{repo}/issues/{number}",
+        }
+        state["issues"].append(issue)
+        return JSONResponse(issue, status_code=201, headers=rate_limit_headers())
+
+    @app.get("/issues")
+    async def list_issues():
+        return state["issues"]
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--limit", type=int, default=60, help="requests allowed per window")
+    parser.add_argument("--window", type=float, default=60.0, help="rate limit window in seconds")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered with a 502")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.limit, args.window, args.fail_rate), host="127.0.0.1", port=args.port)
@@ -0,0 +1,156 @@
+"""Local stand-in for the MyBusTimes API endpoints the bot calls.
+
+Run it on its own and point the bot at it:
+
+    python tools/fake_mbt.py --port 8091 --latency 0.05 --error-rate 0.02
+    MBT_API_URL=http://localhost:8091/api python main.py
+
+or use create_app() from a benchmark. Every request waits for the configured latency
+(plus jitter) and a share of requests fail with a 503. GET /stats returns request counts.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import string
+from collections import Counter
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+import uvicorn
+
+OPERATOR_WORDS = ["Stagecoach", "First", "Arriva", "Go", "Metroline", "Lothian", "Transdev", "National", "Express"]
+AREA_WORDS = ["North", "South", "East", "West", "Midlands", "Coast", "City", "Valley", "Borders"]
+VEHICLE_TYPES = [
+    {"type_name": "Enviro400 MMC", "double_decker": True, "type": "Bus", "fuel": "Diesel"},
+    {"type_name": "Streetlite", "double_decker": False, "type": "Bus", "fuel": "Diesel"},
+    {"type_name": "BYD D8UR", "double_decker": False, "type": "Bus", "fuel": "Electric"},
+    {"type_name": "Gemini 3", "double_decker": True, "type": "Bus", "fuel": "Hybrid"},
+]
+
+
+def build_fleet(size, operators, seed=0):
+    rng = random.Random(seed)
+    operator_names = sorted({f"{rng.choice(OPERATOR_WORDS)} {rng.choice(AREA_WORDS)}" for _ in range(operators)})
+    fleet = []
+    for i in range(size):
+        name = operator_names[i % len(operator_names)]
+        fleet.append({
+            "id": i + 1,
+            "fleet_number": str(rng.randint(1, 99999)),
+            "reg": "".join(rng.choices(string.ascii_uppercase, k=2))
+            + f"{rng.randint(10, 99)}"
+            + "".join(rng.choices(string.ascii_uppercase, k=3)),
+            "operator": {"operator_name": name, "operator_slug": name.lower().replace(" ", "-")},
+            "vehicle_type_data": rng.choice(VEHICLE_TYPES),
+        })
+    return fleet
+
+
+def create_app(latency=0.05, jitter=0.0, error_rate=0.0, fleet_size=5000, operators=200, badges=150, ticket_channel_ids=()):
+    app = FastAPI()
+    stats = Counter()
+    threads = set()
+    fleet = build_fleet(fleet_size, operators)
+    badge_list = {"badges": [{"badge_name": f"Badge {i:03d}"} for i in range(badges)]}
+    badge_etag = '"' + hashlib.sha1(json.dumps(badge_list).encode()).hexdigest() + '"'
+    ticket_channels = {str(c) for c in ticket_channel_ids}
+
+    @app.middleware("http")
+    async def simulate(request: Request, call_next):
+        if request.url.path == "/stats":
+            return await call_next(request)
+
+        route = "/".join(part for part in request.url.path.split("/")[2:] if part and not part.isdigit())
+        stats[f"{request.method} {route}"] += 1
+
+        delay = random.gauss(latency, jitter) if jitter else latency
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if random.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"detail": "Simulated failure"}, status_code=503)
+        return await call_next(request)
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    @app.get("/api/check-thread/{thread_id}/")
+    async def check_thread(thread_id: str):
+        if thread_id not in threads:
+            return JSONResponse({"detail": "Not found"}, status_code=404)
+        return {"exists": True}
+
+    @app.post("/api/create-thread/")
+    async def create_thread(request: Request):
+        payload = await request.json()
+        threads.add(str(payload.get("discord_channel_id")))
+        return JSONResponse({"status": "created"}, status_code=201)
+
+    @app.post("/api/discord-message/")
+    async def discord_message(request: Request):
+        await request.body()
+        return {"status": "ok"}
+
+    @app.get("/api/tickets/")
+    async def tickets(discord_channel_id: str = ""):
+        if discord_channel_id not in ticket_channels:
+            return JSONResponse({"detail": "Not found"}, status_code=404)
+        return {"id": int(discord_channel_id) % 100000, "discord_channel_id": discord_channel_id}
+
+    @app.post("/api/user/")
+    async def user():
+        return {"session_key": "bench-session"}
+
+    @app.post("/api/key-auth/{ticket_id}/messages/")
+    async def ticket_message(ticket_id: int, request: Request):
+        await request.body()
+        return JSONResponse({"status": "ok"}, status_code=201)
+
+    @app.post("/api/user/add_badge/")
+    async def add_badge():
+        return {"status": "ok"}
+
+    @app.get("/api/operator/fleet/")
+    async def operator_fleet(
+        reg: str = "",
+        fleet_number: str = "",
+        operator__operator_name: str = "",
+        limit: int = 10,
+        offset: int = 0,
+    ):
+        reg = "".join(reg.split()).upper()
+        operator = operator__operator_name.casefold()
+        matches = [
+            v for v in fleet
+            if (not reg or reg in v["reg"])
+            and (not fleet_number or v["fleet_number"] == fleet_number)
+            and (not operator or operator in v["operator"]["operator_name"].casefold())
+        ]
+        return {"count": len(matches), "results": matches[offset:offset + limit]}
+
+    @app.get("/api/all-available-badges/")
+    async def all_badges(request: Request):
+        if request.headers.get("If-None-Match") == badge_etag:
+            return Response(status_code=304, headers={"ETag": badge_etag})
+        return JSONResponse(badge_list, headers={"ETag": badge_etag})
+
+    app.state.fleet = fleet
+    app.state.stats = stats
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="standard deviation of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 503")
+    parser.add_argument("--fleet-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.jitter, args.error_rate, args.fleet_size)
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
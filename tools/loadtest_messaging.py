@@ -0,0 +1,227 @@
+"""Load test for the FastAPI messaging routes Django relies on, against a mock bot.
+
+Mounts the real routes from cogs/messaging.py on a BenchBot whose channels take
+--send-delay seconds per send and can be rate limited, serves them with uvicorn on
+localhost and drives /send-message, /send-embed, image uploads and the /stream
+WebSocket at each concurrency level:
+
+    python tools/loadtest_messaging.py --concurrency 1 10 50 --requests 500
+    python tools/loadtest_messaging.py --scenario stream --rate-limit 5/5 --channels 20
+
+The client runs in the same process as the server, so absolute numbers include its
+overhead; compare runs made with the same options. Nothing talks to Discord.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_discord import free_port  # noqa: E402
+from utils.memory import current_rss  # noqa: E402
+
+GUILD_ID = 200000000000000001
+FIRST_CHANNEL_ID = 200000000000001000
+BOT_USER_ID = 200000000000000002
+
+SCENARIOS = ("message", "embed", "upload", "stream")
+UPLOAD = b"\x89PNG\r\n\x1a\n" + b"\0" * (256 * 1024)
+EMBED = {
+    "title": "Load test",
+    "description": "An example embed",
+    "color": 16776960,
+    "fields": [{"name": f"Field {i}", "value": "Value", "inline": True} for i in range(5)],
+    "footer": {"text": "loadtest"},
+}
+
+
+def summarise(latencies, errors, wall, rss_before):
+    ordered = sorted(latencies)
+    quantiles = statistics.quantiles(ordered, n=100) if len(ordered) > 1 else ordered * 99
+    rss = current_rss()
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "rps": len(ordered) / wall if wall else 0.0,
+        "p50_ms": quantiles[49] * 1000 if quantiles else 0.0,
+        "p95_ms": quantiles[94] * 1000 if quantiles else 0.0,
+        "p99_ms": quantiles[98] * 1000 if quantiles else 0.0,
+        "rss_mb": (rss or 0) / 1024 / 1024,
+        "rss_delta_mb": ((rss - rss_before) if rss and rss_before else 0) / 1024 / 1024,
+    }
+
+
+async def drive_http(client, scenario, channel_ids, requests, concurrency):
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def one(i):
+        channel_id = channel_ids[i % len(channel_ids)]
+        if scenario == "embed":
+            return await client.post("/send-embed", json={"channel_id": channel_id, "embed": EMBED})
+        data = {"channel_id": str(channel_id), "send_by": "loadtest", "message": f"Load test message {i}"}
+        if scenario == "upload":
+            return await client.post("/send-message", data=data, files={"image": ("load.png", UPLOAD, "image/png")})
+        return await client.post("/send-message", data=data)
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                resp = await one(i)
+                if resp.status_code != 200:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    rss_before = current_rss()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarise(latencies, errors, time.perf_counter() - start, rss_before)
+
+
+async def drive_stream(port, channel_ids, requests, concurrency):
+    import websockets
+
+    latencies = []
+    errors = 0
+    started = {}
+    done = asyncio.Event()
+
+    rss_before = current_rss()
+    start = time.perf_counter()
+    async with websockets.connect(f"ws://127.0.0.1:{port}/stream", max_size=None) as ws:
+        hello = json.loads(await ws.recv())
+        in_flight = asyncio.Semaphore(min(concurrency, hello.get("window", concurrency)))
+
+        async def receive():
+            nonlocal errors
+            while len(latencies) < requests:
+                reply = json.loads(await ws.recv())
+                sent_at = started.pop(reply.get("id"), None)
+                if sent_at is None:
+                    continue
+                latencies.append(time.perf_counter() - sent_at)
+                if not reply.get("ok"):
+                    errors += 1
+                in_flight.release()
+            done.set()
+
+        receiver = asyncio.create_task(receive())
+        for i in range(requests):
+            await in_flight.acquire()
+            command_id = str(i)
+            started[command_id] = time.perf_counter()
+            await ws.send(json.dumps({
+                "id": command_id,
+                "type": "message",
+                "channel_id": channel_ids[i % len(channel_ids)],
+                "send_by": "loadtest",
+                "message": f"Load test message {i}",
+            }))
+        await done.wait()
+        await receiver
+
+    return summarise(latencies, errors, time.perf_counter() - start, rss_before)
+
+
+async def run(args):
+    import httpx
+    import uvicorn
+    from fastapi import FastAPI
+    from fake_discord import BenchBot, BenchGuild, BenchTextChannel, BenchUser, SendRateLimit
+    from cogs.messaging import setup_routes
+
+    guild = BenchGuild(GUILD_ID)
+    bot = BenchBot(BenchUser(BOT_USER_ID, "JessBot"), [guild])
+    channel_ids = []
+    for i in range(args.channels):
+        rate_limit = SendRateLimit(*args.rate_limit) if args.rate_limit else None
+        channel = guild.add_channel(
+            BenchTextChannel(FIRST_CHANNEL_ID + i, guild, send_delay=args.send_delay, rate_limit=rate_limit)
+        )
+        channel_ids.append(channel.id)
+
+    ready = asyncio.Event()
+    ready.set()
+    app = FastAPI()
+    app.include_router(setup_routes(bot, GUILD_ID, 0, ready))
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning", loop="asyncio"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    results = {}
+    try:
+        limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=120) as client:
+            for concurrency in args.concurrency:
+                for scenario in args.scenario or SCENARIOS:
+                    if scenario == "stream":
+                        summary = await drive_stream(args.port, channel_ids, args.requests, concurrency)
+                    else:
+                        summary = await drive_http(client, scenario, channel_ids, args.requests, concurrency)
+                    results[f"{scenario}@{concurrency}"] = summary
+                    print_row(scenario, concurrency, summary)
+    finally:
+        server.should_exit = True
+        await server_task
+
+    sent = sum(guild.get_channel(c).sent for c in channel_ids)
+    print(f"\nchannel.send called {sent} times")
+    return results
+
+
+COLUMNS = ["requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "rss_mb", "rss_delta_mb"]
+
+
+def print_header():
+    print(f"{'scenario':<10}{'conc':>6}" + "".join(f"{c:>14}" for c in COLUMNS))
+
+
+def print_row(scenario, concurrency, summary):
+    print(f"{scenario:<10}{concurrency:>6}" + "".join(f"{summary[c]:>14.2f}" for c in COLUMNS))
+
+
+def parse_rate_limit(value):
+    """'5/5' -> (5, 5.0): five sends per five seconds per channel."""
+    if value in ("", "0", "none"):
+        return None
+    count, per = value.split("/")
+    return int(count), float(per)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="run only this scenario (repeatable)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario and concurrency level")
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--send-delay", type=float, default=0.05, help="seconds each channel.send takes")
+    parser.add_argument("--rate-limit", type=parse_rate_limit, default=None, help="per-channel limit such as 5/5")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--save", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    args.port = args.port or free_port()
+    print_header()
+    results = asyncio.run(run(args))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import random
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0  # Seconds before the first retry, doubled on each attempt
+BACKOFF_MAX = 60.0
+RETRY_SAFE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class GitHubError(Exception):
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+class RateLimitTracker:
+    """Follows GitHub's X-RateLimit-* and Retry-After headers so requests wait instead of failing."""
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0  # Unix time the current window resets
+        self.blocked_until = 0.0  # Unix time a Retry-After response asked us to wait until
+
+    def update(self, response):
+        headers = response.headers
+        try:
+            if "X-RateLimit-Limit" in headers:
+                self.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                self.reset_at = float(headers["X-RateLimit-Reset"])
+            if "Retry-After" in headers:
+                self.blocked_until = time.time() + float(headers["Retry-After"])
+        except ValueError:
+            logger.warning("Ignoring malformed rate limit headers: %s", dict(headers))
+
+    def delay(self):
+        """Seconds to wait before the next request may be sent."""
+        now = time.time()
+        wait = self.blocked_until - now
+        if self.remaining == 0:
+            wait = max(wait, self.reset_at - now + 1)
+        return max(wait, 0.0)
+
+    def ready_at(self):
+        """Unix time the next request may be sent."""
+        return time.time() + self.delay()
+
+    def is_rate_limited(self, response):
+        if response.status_code == 429:
+            return True
+        return response.status_code == 403 and (
+            self.remaining == 0 or "Retry-After" in response.headers
+        )
+
+
+class GitHubClient:
+    """Pooled GitHub API client that creates issues one at a time from a queue, with retries."""
+
+    def __init__(self, token, base_url=GITHUB_API_URL, max_retries=MAX_RETRIES, transport=None):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={
+                "Authorization": f"token {token}",
+                "Accept": "application/vnd.github+json",
+                "User-Agent": "MyBusTimesBot",
+            },
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+            transport=transport,
+        )
+        self.max_retries = max_retries
+        self.rate_limit = RateLimitTracker()
+        self.queue = asyncio.Queue()
+        self.worker = None
+
+    def start(self):
+        if self.worker is None:
+            self.worker = asyncio.create_task(self._work())
+
+    async def close(self):
+        if self.worker:
+            self.worker.cancel()
+            self.worker = None
+        while not self.queue.empty():
+            _, _, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(GitHubError("GitHub client closed"))
+        await self.client.aclose()
+
+    def pending(self):
+        return self.queue.qsize()
+
+    async def create_issue(self, repo, title, body):
+        """Queue an issue for creation and wait for GitHub's final response."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((f"/repos/{repo}/issues", {"title": title, "body": body}, future))
+        return await future
+
+    async def _work(self):
+        while True:
+            path, payload, future = await self.queue.get()
+            try:
+                if not future.done():
+                    response = await self.request("POST", path, json=payload)
+                    if not future.done():
+                        future.set_result(response)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    async def request(self, method, path, **kwargs):
+        """Send a request, waiting out rate limits and retrying network and server errors.
+
+        A POST is only retried when it certainly wasn't processed: on rate limit responses and
+        on errors connecting. A 5xx from GitHub's edge may come after the issue was created.
+        """
+        for attempt in range(self.max_retries + 1):
+            delay = self.rate_limit.delay()
+            if delay:
+                logger.warning("GitHub rate limit reached, waiting %.0fs", delay)
+                await asyncio.sleep(delay)
+
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except httpx.RequestError as e:
+                # Only retry a POST if it never reached GitHub, to avoid duplicate issues
+                if attempt == self.max_retries or (method != "GET" and not isinstance(e, RETRY_SAFE_ERRORS)):
+                    raise
+                logger.warning("GitHub request failed (%s), retrying", e)
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            self.rate_limit.update(response)
+
+            if self.rate_limit.is_rate_limited(response):
+                if attempt == self.max_retries:
+                    return response
+                if not self.rate_limit.delay():
+                    await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code >= 500 and method == "GET" and attempt < self.max_retries:
+                logger.warning("GitHub returned %s, retrying", response.status_code)
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            return response
+
+    @staticmethod
+    def _backoff(attempt):
+        return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
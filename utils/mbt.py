@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+# Base URL of the MyBusTimes API; point it at a local stand-in for testing or benchmarks
+MBT_API_URL = os.getenv("MBT_API_URL", "https://www.mybustimes.cc/api").rstrip("/")
+
+FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+RESET_TIMEOUT = 15.0  # Seconds the circuit stays open before a probe is let through
+MAX_RESET_TIMEOUT = 300.0  # Upper bound as the open period doubles after failed probes
+TARGET_LATENCY = 2.0  # Calls slower than this shrink the concurrency limit
+INITIAL_LIMIT = 8
+MIN_LIMIT = 1
+MAX_LIMIT = 32
+MAX_WAITING = 100  # Calls queued for a slot before new ones fail fast
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, group, retry_in=0.0, reason="circuit open"):
+        super().__init__(f"MyBusTimes {group} API unavailable ({reason})")
+        self.group = group
+        self.retry_in = retry_in
+
+
+class _Call:
+    def __init__(self):
+        self.failed = False
+
+    def fail(self):
+        """Count this call as a failure even though it returned, e.g. on a 5xx response."""
+        self.failed = True
+
+
+class EndpointGuard:
+    """Circuit breaker with an AIMD concurrency limit for one group of API endpoints.
+
+    Closed: calls run with at most `limit` in flight. The limit grows by about one per
+    round of fast successes and shrinks on slow calls and failures. FAILURE_THRESHOLD
+    failures in a row open the circuit. Open: calls fail fast with CircuitOpenError.
+    Half-open: after the reset timeout one probe call is let through; success closes the
+    circuit, failure reopens it for twice as long.
+    """
+
+    def __init__(self, group):
+        self.group = group
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.reset_timeout = RESET_TIMEOUT
+        self.limit = float(INITIAL_LIMIT)
+        self.in_flight = 0
+        self.waiters = deque()
+        self.probing = False
+
+    def retry_in(self):
+        """Seconds until the circuit lets a probe through (0 when not open)."""
+        if self.state != OPEN:
+            return 0.0
+        return max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def is_open(self):
+        return self.state == OPEN and self.retry_in() > 0
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self.waiters),
+            "retry_in": round(self.retry_in(), 1),
+        }
+
+    @asynccontextmanager
+    async def call(self):
+        probe = self._admit()
+        if probe:
+            self.in_flight += 1
+        else:
+            await self._acquire()
+            if self.state != CLOSED:
+                # The circuit opened while we were queued
+                self._release()
+                raise CircuitOpenError(self.group, self.retry_in())
+
+        call = _Call()
+        start = time.monotonic()
+        try:
+            yield call
+        except Exception:
+            self._record(False, time.monotonic() - start)
+            raise
+        else:
+            self._record(not call.failed, time.monotonic() - start)
+        finally:
+            if probe:
+                self.probing = False
+            self._release()
+
+    def _admit(self):
+        """Raise if the circuit is open; return True if this call is the half-open probe."""
+        if self.state == OPEN:
+            if self.retry_in() > 0:
+                raise CircuitOpenError(self.group, self.retry_in())
+            self.state = HALF_OPEN
+            logger.warning("MyBusTimes %s circuit half-open, sending a probe", self.group)
+
+        if self.state == HALF_OPEN:
+            if self.probing:
+                raise CircuitOpenError(self.group, reason="probe in progress")
+            self.probing = True
+            return True
+        return False
+
+    async def _acquire(self):
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            return
+        if len(self.waiters) >= MAX_WAITING:
+            raise CircuitOpenError(self.group, reason="too many queued calls")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self._release()  # A slot was handed over just as we were cancelled
+            raise
+
+    def _release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _fail_waiters(self):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(CircuitOpenError(self.group, self.retry_in()))
+
+    def _record(self, ok, elapsed):
+        if ok:
+            self.failures = 0
+            if self.state == HALF_OPEN:
+                logger.warning("MyBusTimes %s circuit closed after a successful probe", self.group)
+                self.state = CLOSED
+                self.reset_timeout = RESET_TIMEOUT
+                self.limit = float(MIN_LIMIT)
+            if elapsed <= TARGET_LATENCY:
+                self.limit = min(self.limit + 1 / self.limit, MAX_LIMIT)
+            else:
+                self.limit = max(self.limit * 0.9, MIN_LIMIT)
+            self._wake()
+            return
+
+        self.failures += 1
+        self.limit = max(self.limit / 2, MIN_LIMIT)
+        if self.state == HALF_OPEN:
+            self.reset_timeout = min(self.reset_timeout * 2, MAX_RESET_TIMEOUT)
+            self._open()
+        elif self.state == CLOSED and self.failures >= FAILURE_THRESHOLD:
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        logger.warning(
+            "MyBusTimes %s circuit open after %d failures, retrying in %.0fs",
+            self.group, self.failures, self.reset_timeout,
+        )
+        self._fail_waiters()
+
+
+_guards = {}
+
+
+def mbt_guard(group):
+    """The shared guard for an endpoint group: forum, tickets, auth, fleet, fleet-index or badges."""
+    guard = _guards.get(group)
+    if guard is None:
+        guard = _guards[group] = EndpointGuard(group)
+    return guard
+
+
+def all_guards():
+    return dict(_guards)
+
+
+async def guarded_request(group, client, method, url, **kwargs):
+    """Make one httpx request through the group's guard, counting 5xx responses as failures."""
+    async with mbt_guard(group).call() as call:
+        resp = await client.request(method, url, **kwargs)
+        if resp.status_code >= 500:
+            call.fail()
+    return resp
@@ -0,0 +1,233 @@
+import asyncio
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import random
+import secrets
+import time
+from contextlib import contextmanager
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "jess-bot"
+OTLP_FLUSH_SECONDS = 5
+OTLP_BATCH_SIZE = 256
+OTLP_MAX_BUFFER = 4096  # Spans kept while the collector is unreachable; newer spans are dropped beyond this
+
+_current = contextvars.ContextVar("trace_span", default=None)
+_UNSAMPLED = object()
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns", "error")
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self):
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """In-process tracer. A span opened with no trace active starts a new trace, sampled at sample_rate.
+
+    Spans nest through a context variable, so callers don't pass the trace around; child spans
+    copy their parent's attributes (e.g. thread_id and channel_id). Unsampled traces cost one
+    random() call and a context variable set per root span.
+    """
+
+    def __init__(self, sample_rate=0.0, exporter=None):
+        self.sample_rate = sample_rate if exporter else 0.0
+        self.exporter = exporter
+
+    @contextmanager
+    def span(self, name, **attributes):
+        parent = _current.get()
+        if parent is _UNSAMPLED or (parent is None and random.random() >= self.sample_rate):
+            token = _current.set(_UNSAMPLED) if parent is None else None
+            try:
+                yield NOOP_SPAN
+            finally:
+                if token is not None:
+                    _current.reset(token)
+            return
+
+        if parent is None:
+            span = Span(name, secrets.token_hex(16), None, attributes)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, {**parent.attributes, **attributes})
+
+        token = _current.set(span)
+        start = time.perf_counter_ns()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            span.end_ns = span.start_ns + (time.perf_counter_ns() - start)
+            _current.reset(token)
+            try:
+                self.exporter.export(span)
+            except Exception:
+                logger.exception("Failed to export span %s", name)
+
+    def flush(self):
+        if self.exporter:
+            self.exporter.flush()
+
+    def close(self):
+        if self.exporter:
+            self.exporter.close()
+
+
+class JsonlExporter:
+    """Writes one JSON object per span to a size-rotated file, buffering writes in memory.
+
+    The buffer is written out when full and on flush(), which the owner calls periodically.
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backups=5, buffer=20):
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self.handler = logging.handlers.MemoryHandler(buffer, flushLevel=logging.CRITICAL + 1, target=handler)
+        self.logger = logging.getLogger(f"{__name__}.jsonl")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(self.handler)
+
+    def export(self, span):
+        self.logger.info(json.dumps(span.to_dict(), default=str))
+
+    def flush(self):
+        self.handler.flush()
+
+    def close(self):
+        self.handler.close()
+        self.logger.removeHandler(self.handler)
+
+
+class OtlpExporter:
+    """Batches spans and posts them to an OTLP/HTTP collector (e.g. http://localhost:4318/v1/traces)."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.buffer = []
+        self.dropped = 0
+        self.task = None
+        self.client = None
+
+    def export(self, span):
+        if len(self.buffer) >= OTLP_MAX_BUFFER:
+            self.dropped += 1
+            return
+        self.buffer.append(span)
+        if self.task is None:
+            self.client = httpx.AsyncClient(timeout=5.0)
+            self.task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(OTLP_FLUSH_SECONDS)
+            while self.buffer:
+                batch, self.buffer = self.buffer[:OTLP_BATCH_SIZE], self.buffer[OTLP_BATCH_SIZE:]
+                try:
+                    resp = await self.client.post(self.endpoint, json=self._payload(batch))
+                    resp.raise_for_status()
+                except Exception as e:
+                    logger.warning("Failed to export %d spans to %s: %s", len(batch), self.endpoint, e)
+                    break
+            if self.dropped:
+                logger.warning("Dropped %d spans while the OTLP buffer was full", self.dropped)
+                self.dropped = 0
+
+    @staticmethod
+    def _payload(spans):
+        def attributes(values):
+            return [{"key": k, "value": {"stringValue": str(v)}} for k, v in values.items()]
+
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [
+                        {
+                            "traceId": span.trace_id,
+                            "spanId": span.span_id,
+                            **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                            "name": span.name,
+                            "kind": 1,
+                            "startTimeUnixNano": str(span.start_ns),
+                            "endTimeUnixNano": str(span.end_ns),
+                            "attributes": attributes(span.attributes),
+                            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                        }
+                        for span in spans
+                    ],
+                }],
+            }]
+        }
+
+    def flush(self):
+        pass  # Batches are already posted every OTLP_FLUSH_SECONDS
+
+    def close(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        if self.client:
+            asyncio.get_running_loop().create_task(self.client.aclose())
+            self.client = None
+
+
+def tracer_from_env():
+    """Build a tracer from TRACE_SAMPLE_RATE, TRACE_EXPORTER (jsonl or otlp), TRACE_FILE and TRACE_OTLP_ENDPOINT."""
+    sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+    if sample_rate <= 0:
+        return Tracer()
+
+    kind = os.getenv("TRACE_EXPORTER", "jsonl")
+    if kind == "otlp":
+        exporter = OtlpExporter(os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"))
+    else:
+        exporter = JsonlExporter(
+            os.getenv("TRACE_FILE", "traces.jsonl"),
+            max_bytes=int(os.getenv("TRACE_FILE_MAX_BYTES", 10 * 1024 * 1024)),
+        )
+    return Tracer(min(sample_rate, 1.0), exporter)